@@ -4,7 +4,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Iterable
 
-from app.domain.interfaces import ClipScanner, HashCalculator
+from app.domain.interfaces import ClipScanner, HashCalculator, MultiRootClipScanner
 from app.domain.models import HashReport, ScanReport
 
 
@@ -22,6 +22,20 @@ class ScanClipsUseCase:
         return self._scanner.scan(request.root, request.timezone_name)
 
 
+@dataclass(frozen=True)
+class MultiRootScanRequest:
+    roots: tuple[Path, ...]
+    timezone_name: str = "Europe/Warsaw"
+
+
+class ScanRootsUseCase:
+    def __init__(self, scanner: MultiRootClipScanner) -> None:
+        self._scanner = scanner
+
+    def execute(self, request: MultiRootScanRequest) -> ScanReport:
+        return self._scanner.scan_roots(request.roots, request.timezone_name)
+
+
 @dataclass(frozen=True)
 class HashRequest:
     paths: tuple[Path, ...]
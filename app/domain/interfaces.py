@@ -3,7 +3,7 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Iterable, Protocol
+from typing import Callable, Iterable, Protocol, Sequence
 
 from app.domain.models import HashReport, ScanReport
 
@@ -29,6 +29,11 @@ class ClipScanner(Protocol):
         ...
 
 
+class MultiRootClipScanner(Protocol):
+    def scan_roots(self, roots: Sequence[Path], timezone_name: str) -> ScanReport:
+        ...
+
+
 class HashCalculator(Protocol):
     def compute_hashes(self, paths: Iterable[Path]) -> HashReport:
         ...
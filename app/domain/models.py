@@ -19,6 +19,8 @@ class VideoClip:
     start_time: datetime
     end_time: datetime
     duration: timedelta
+    provisional: bool = False
+    source_root: Optional[Path] = None
 
     def contains(self, moment: datetime) -> bool:
         return self.start_time <= moment <= self.end_time
@@ -28,6 +30,14 @@ class VideoClip:
 class CameraClipIndex:
     camera_label: str
     clips: tuple[VideoClip, ...]
+    source_root: Optional[Path] = None
+    source_label: Optional[str] = None
+
+    @property
+    def qualified_label(self) -> str:
+        if self.source_root is None:
+            return self.camera_label
+        return f"{self.source_label or self.source_root.name or self.source_root}/{self.camera_label}"
 
     def clip_for_time(self, moment: datetime) -> Optional[VideoClip]:
         for clip in self.clips:
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import shutil
+import subprocess
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from app.domain.models import CameraClipIndex, ScanErrorItem, VideoClip
+from app.infra.process_priority import lower_current_process_priority
+
+ACTIVITY_VERSION = 2
+ANALYSIS_WIDTH = 96
+ANALYSIS_HEIGHT = 54
+ANALYSIS_FPS = 1.0
+
+
+@dataclass(frozen=True)
+class ClipActivity:
+    path: Path
+    timestamps: np.ndarray
+    scores: np.ndarray
+
+
+@dataclass(frozen=True)
+class AnalyzedClip:
+    # Klip jest analizowany ponownie, gdy zmieni się rozmiar, mtime albo początek na osi czasu.
+    path: str
+    size: int
+    mtime: float
+    start_epoch: float
+
+
+@dataclass(frozen=True)
+class ActivityReport:
+    camera_label: str
+    analyzed_clips: int
+    samples: int
+    errors: tuple[ScanErrorItem, ...] = field(default_factory=tuple)
+
+
+@dataclass
+class _CameraBatch:
+    camera_label: str
+    clips: list[AnalyzedClip]
+    timestamps: list[np.ndarray]
+    scores: list[np.ndarray]
+    owners: list[np.ndarray]
+    pending: list[tuple[VideoClip, AnalyzedClip]]
+    errors: list[ScanErrorItem] = field(default_factory=list)
+
+    def add(self, analyzed_clip: AnalyzedClip, activity: ClipActivity) -> None:
+        self.timestamps.append(np.floor(activity.timestamps).astype(np.int64))
+        self.scores.append(np.clip(np.rint(activity.scores), 0, 255).astype(np.uint8))
+        self.owners.append(np.full(activity.scores.size, len(self.clips), dtype=np.int64))
+        self.clips.append(analyzed_clip)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy nie jest dostępny")
+
+
+def activity_dir_for(cache_location: Path) -> Path:
+    return cache_location.with_name(cache_location.name + ".activity")
+
+
+def analyzed_clip_for(path: Path, start_epoch: float) -> Optional[AnalyzedClip]:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return AnalyzedClip(path=str(path), size=stat.st_size, mtime=stat.st_mtime, start_epoch=start_epoch)
+
+
+def _decode_gray_frames(path: Path, ffmpeg_executable: str) -> np.ndarray:
+    completed = subprocess.run(
+        [
+            ffmpeg_executable,
+            "-v",
+            "error",
+            "-threads",
+            "1",
+            "-i",
+            str(path),
+            "-an",
+            "-vf",
+            f"fps={ANALYSIS_FPS},scale={ANALYSIS_WIDTH}:{ANALYSIS_HEIGHT},format=gray",
+            "-f",
+            "rawvideo",
+            "pipe:1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    frame_size = ANALYSIS_WIDTH * ANALYSIS_HEIGHT
+    usable = len(completed.stdout) // frame_size * frame_size
+    return np.frombuffer(completed.stdout[:usable], dtype=np.uint8).reshape(-1, ANALYSIS_HEIGHT, ANALYSIS_WIDTH)
+
+
+def frame_difference_scores(frames: np.ndarray) -> np.ndarray:
+    # Średnia bezwzględna różnica sąsiednich klatek (0-255), pierwsza klatka = 0.
+    if len(frames) < 2:
+        return np.zeros(len(frames), dtype=np.float32)
+    signed = frames.astype(np.int16)
+    differences = np.abs(np.diff(signed, axis=0)).mean(axis=(1, 2), dtype=np.float32)
+    return np.concatenate((np.zeros(1, dtype=np.float32), differences))
+
+
+def analyze_clip(
+    path: Path,
+    start_epoch: float,
+    ffmpeg_executable: str = "ffmpeg",
+) -> ClipActivity:
+    _require_numpy()
+    frames = _decode_gray_frames(path, ffmpeg_executable)
+    scores = frame_difference_scores(frames)
+    timestamps = start_epoch + np.arange(len(scores), dtype=np.float64) / ANALYSIS_FPS
+    return ClipActivity(path=path, timestamps=timestamps, scores=scores)
+
+
+class ActivityIndex:
+    def __init__(self, directory: Path) -> None:
+        _require_numpy()
+        self._directory = directory
+
+    def _series_path(self, camera_label: str) -> Path:
+        digest = hashlib.sha256(camera_label.encode("utf-8")).hexdigest()[:16]
+        return self._directory / f"{digest}.npz"
+
+    def load(self, camera_label: str) -> tuple[np.ndarray, np.ndarray, np.ndarray, list[AnalyzedClip]]:
+        path = self._series_path(camera_label)
+        empty = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int32), [])
+        if not path.exists():
+            return empty
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"][0]) != ACTIVITY_VERSION:
+                    return empty
+                clips = [
+                    AnalyzedClip(path=str(clip_path), size=int(size), mtime=float(mtime), start_epoch=float(start))
+                    for clip_path, size, mtime, start in zip(
+                        data["clip_paths"], data["clip_sizes"], data["clip_mtimes"], data["clip_starts"]
+                    )
+                ]
+                return data["timestamps"].copy(), data["scores"].copy(), data["owners"].copy(), clips
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Ucięty lub uszkodzony plik serii traktujemy jak brak serii - zostanie przeliczona.
+            return empty
+
+    def save(
+        self,
+        camera_label: str,
+        timestamps: np.ndarray,
+        scores: np.ndarray,
+        owners: np.ndarray,
+        clips: list[AnalyzedClip],
+    ) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        order = np.argsort(timestamps, kind="stable")
+        path = self._series_path(camera_label)
+        temporary_path = path.with_name(path.stem + ".tmp.npz")
+        np.savez_compressed(
+            temporary_path,
+            version=np.array([ACTIVITY_VERSION]),
+            camera_label=np.array([camera_label], dtype=np.str_),
+            timestamps=timestamps[order].astype(np.int64),
+            scores=scores[order].astype(np.uint8),
+            owners=owners[order].astype(np.int32),
+            clip_paths=np.array([clip.path for clip in clips], dtype=np.str_),
+            clip_sizes=np.array([clip.size for clip in clips], dtype=np.int64),
+            clip_mtimes=np.array([clip.mtime for clip in clips], dtype=np.float64),
+            clip_starts=np.array([clip.start_epoch for clip in clips], dtype=np.float64),
+        )
+        temporary_path.replace(path)
+
+    def _prepare(self, index: CameraClipIndex) -> _CameraBatch:
+        timestamps, scores, owners, stored = self.load(index.camera_label)
+
+        current: dict[str, tuple[VideoClip, AnalyzedClip]] = {}
+        for clip in index.clips:
+            analyzed_clip = None if clip.provisional else analyzed_clip_for(clip.path, clip.start_time.timestamp())
+            if analyzed_clip is not None:
+                current[analyzed_clip.path] = (clip, analyzed_clip)
+        current_clips = {analyzed_clip for _, analyzed_clip in current.values()}
+
+        # Próbki usuniętych, zmienionych lub przesuniętych w czasie klipów wypadają z serii.
+        kept = [
+            position
+            for position, item in enumerate(stored)
+            if item in current_clips
+            or (item.path not in current and analyzed_clip_for(Path(item.path), item.start_epoch) == item)
+        ]
+        remap = np.full(len(stored), -1, dtype=np.int64)
+        remap[kept] = np.arange(len(kept))
+        owned = remap[owners] if len(stored) else np.zeros(0, dtype=np.int64)
+        valid = owned >= 0
+        clips = [stored[position] for position in kept]
+        analyzed = set(clips)
+        return _CameraBatch(
+            camera_label=index.camera_label,
+            clips=clips,
+            timestamps=[timestamps[valid]],
+            scores=[scores[valid]],
+            owners=[owned[valid]],
+            pending=[item for item in current.values() if item[1] not in analyzed],
+        )
+
+    def analyze_many(
+        self,
+        indexes: Sequence[CameraClipIndex],
+        ffmpeg_executable: str = "ffmpeg",
+        max_workers: int | None = None,
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> list[ActivityReport]:
+        if shutil.which(ffmpeg_executable) is None:
+            raise RuntimeError("ffmpeg nie jest dostępny")
+        batches = [self._prepare(index) for index in indexes]
+        total = sum(len(batch.pending) for batch in batches)
+
+        # Jedna pula dla klipów wszystkich kamer - przy kilku nowych klipach na kamerę procesy nie stoją.
+        # Niższy priorytet procesów roboczych i jeden wątek ffmpeg na klip - laptop pozostaje używalny.
+        workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=lower_current_process_priority) as executor:
+            futures: dict[Future[ClipActivity], tuple[_CameraBatch, VideoClip, AnalyzedClip]] = {}
+            for batch in batches:
+                for clip, analyzed_clip in batch.pending:
+                    future = executor.submit(analyze_clip, clip.path, analyzed_clip.start_epoch, ffmpeg_executable)
+                    futures[future] = (batch, clip, analyzed_clip)
+            for done, (future, (batch, clip, analyzed_clip)) in enumerate(futures.items(), start=1):
+                try:
+                    activity = future.result()
+                except subprocess.CalledProcessError as exc:
+                    stderr = exc.stderr.decode("utf-8", errors="replace").strip() if exc.stderr else None
+                    batch.errors.append(
+                        ScanErrorItem(path=clip.path, message="Nie udało się zdekodować klipu", context=stderr)
+                    )
+                except Exception as exc:
+                    # OSError, zepsuta pula procesów itp. - błąd jednego klipu, reszta wyników zostaje zapisana.
+                    batch.errors.append(
+                        ScanErrorItem(path=clip.path, message="Nie udało się przeanalizować klipu", context=str(exc))
+                    )
+                else:
+                    batch.add(analyzed_clip, activity)
+                if progress_callback is not None:
+                    progress_callback(done, total)
+
+        reports: list[ActivityReport] = []
+        for batch in batches:
+            timestamps = np.concatenate(batch.timestamps)
+            self.save(
+                batch.camera_label,
+                timestamps,
+                np.concatenate(batch.scores),
+                np.concatenate(batch.owners),
+                batch.clips,
+            )
+            reports.append(
+                ActivityReport(
+                    camera_label=batch.camera_label,
+                    analyzed_clips=len(batch.pending) - len(batch.errors),
+                    samples=int(timestamps.size),
+                    errors=tuple(batch.errors),
+                )
+            )
+        return reports
+
+    def analyze(
+        self,
+        index: CameraClipIndex,
+        ffmpeg_executable: str = "ffmpeg",
+        max_workers: int | None = None,
+        progress_callback: Callable[[int, int], None] | None = None,
+    ) -> ActivityReport:
+        return self.analyze_many([index], ffmpeg_executable, max_workers, progress_callback)[0]
+
+    def next_activity_after(
+        self,
+        camera_label: str,
+        moment: datetime,
+        threshold: float,
+    ) -> Optional[datetime]:
+        timestamps, scores, _, _ = self.load(camera_label)
+        position = int(np.searchsorted(timestamps, math.floor(moment.timestamp()), side="right"))
+        hits = np.flatnonzero(scores[position:] >= threshold)
+        if hits.size == 0:
+            return None
+        found = int(timestamps[position + int(hits[0])])
+        return datetime.fromtimestamp(found, timezone.utc).astimezone(moment.tzinfo)
+
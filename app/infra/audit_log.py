@@ -13,6 +13,10 @@ class AuditEntry:
     timestamp: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+def format_audit_entry(entry: AuditEntry) -> str:
+    return f"{entry.timestamp.isoformat()} | {entry.event} | {entry.message}\n"
+
+
 class AuditLogger:
     def __init__(self, log_path: Path) -> None:
         self._log_path = log_path
@@ -20,7 +24,7 @@ class AuditLogger:
 
     def write(self, entry: AuditEntry) -> None:
         with self._log_path.open("a", encoding="utf-8") as handle:
-            handle.write(f"{entry.timestamp.isoformat()} | {entry.event} | {entry.message}\n")
+            handle.write(format_audit_entry(entry))
 
     def write_many(self, entries: Iterable[AuditEntry]) -> None:
         for entry in entries:
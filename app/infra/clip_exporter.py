@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import shutil
 import subprocess
+import tempfile
+import zipfile
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable
+from typing import BinaryIO, Iterable, Iterator
 
-from app.domain.models import HashReport
-from app.infra.audit_log import AuditEntry, AuditLogger
+from app.domain.models import HashReport, HashReportEntry
+from app.infra.audit_log import AuditEntry, AuditLogger, format_audit_entry
+
+_CHUNK_SIZE = 1024 * 1024
+
+# Kontenery, które ffmpeg potrafi zapisać do potoku (bez cofania się w pliku).
+_STREAMING_CONTAINERS: dict[str, tuple[str, ...]] = {
+    ".mp4": ("-f", "mp4", "-movflags", "frag_keyframe+empty_moov+default_base_moof"),
+    ".mov": ("-f", "mov", "-movflags", "frag_keyframe+empty_moov+default_base_moof"),
+    ".mkv": ("-f", "matroska"),
+    ".ts": ("-f", "mpegts"),
+    ".m2ts": ("-f", "mpegts"),
+    ".mpg": ("-f", "mpeg"),
+    ".mpeg": ("-f", "mpeg"),
+    ".vob": ("-f", "vob"),
+}
 
 
 @dataclass(frozen=True)
@@ -21,6 +38,41 @@ class EvidencePackage:
     audit_log_path: Path
 
 
+@dataclass(frozen=True)
+class EvidenceArchive:
+    archive_path: Path
+    archive_sha256: str
+    checksum_path: Path
+    hash_report: HashReport
+
+
+class _HashingWriter:
+    # Celowo bez seek()/tell(): zipfile zapisuje wtedy sekwencyjnie (data descriptors),
+    # więc skrót archiwum liczy się w jednym przebiegu zapisu.
+    def __init__(self, handle: BinaryIO) -> None:
+        self._handle = handle
+        self._digest = hashlib.sha256()
+
+    def write(self, data: bytes) -> int:
+        self._digest.update(data)
+        return self._handle.write(data)
+
+    def flush(self) -> None:
+        self._handle.flush()
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def streaming_suffix(suffix: str) -> str:
+    return suffix.lower() if suffix.lower() in _STREAMING_CONTAINERS else ".mkv"
+
+
+def iter_file_chunks(path: Path) -> Iterator[bytes]:
+    with path.open("rb") as handle:
+        yield from iter(lambda: handle.read(_CHUNK_SIZE), b"")
+
+
 class ClipExporter:
     def __init__(self, ffmpeg_executable: str = "ffmpeg") -> None:
         self._ffmpeg_executable = ffmpeg_executable
@@ -54,13 +106,66 @@ class ClipExporter:
             capture_output=True,
         )
 
+    def stream_segment(
+        self,
+        input_path: Path,
+        start_offset_seconds: float,
+        duration_seconds: float,
+        suffix: str,
+    ) -> Iterator[bytes]:
+        if shutil.which(self._ffmpeg_executable) is None:
+            raise RuntimeError("ffmpeg nie jest dostępny")
+        command = [
+            self._ffmpeg_executable,
+            "-v",
+            "error",
+            "-ss",
+            f"{max(0.0, start_offset_seconds):.3f}",
+            "-i",
+            str(input_path),
+            "-t",
+            f"{max(0.0, duration_seconds):.3f}",
+            "-c",
+            "copy",
+            *_STREAMING_CONTAINERS[streaming_suffix(suffix)],
+            "pipe:1",
+        ]
+        # stderr do pliku tymczasowego: przy uszkodzonym nagraniu ffmpeg loguje dużo błędów
+        # i pełny potok zablokowałby go, zanim stdout dojdzie do końca.
+        stderr_file = tempfile.TemporaryFile()
+        try:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+        except BaseException:
+            stderr_file.close()
+            raise
+        return self._read_process(process, command, stderr_file)
+
+    @staticmethod
+    def _read_process(process: subprocess.Popen, command: list[str], stderr_file: BinaryIO) -> Iterator[bytes]:
+        try:
+            assert process.stdout is not None
+            yield from iter(lambda: process.stdout.read(_CHUNK_SIZE), b"")
+            if process.wait() != 0:
+                stderr_file.seek(0)
+                raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr_file.read())
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            if process.stdout is not None:
+                process.stdout.close()
+            stderr_file.close()
+
 
 def write_hash_report(report: HashReport, output_path: Path) -> None:
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    with output_path.open("w", encoding="utf-8") as handle:
-        handle.write("path,sha256\n")
-        for path, digest in report.to_rows():
-            handle.write(f"{path},{digest}\n")
+    output_path.write_text(format_hash_report(report), encoding="utf-8")
+
+
+def format_hash_report(report: HashReport) -> str:
+    lines = ["path,sha256\n"]
+    lines.extend(f"{path},{digest}\n" for path, digest in report.to_rows())
+    return "".join(lines)
 
 
 def write_metadata(output_path: Path, payload: dict) -> None:
@@ -93,3 +198,52 @@ def create_evidence_package(
         metadata_path=metadata_path,
         audit_log_path=audit_log_path,
     )
+
+
+def create_evidence_archive(
+    archive_path: Path,
+    clip_name: str,
+    clip_chunks: Iterable[bytes],
+    metadata: dict,
+    audit_entries: Iterable[AuditEntry],
+) -> EvidenceArchive:
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    entries: list[HashReportEntry] = []
+
+    def add_member(zip_file: zipfile.ZipFile, name: str, chunks: Iterable[bytes]) -> None:
+        info = zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        digest = hashlib.sha256()
+        with zip_file.open(info, "w", force_zip64=True) as member:
+            for chunk in chunks:
+                digest.update(chunk)
+                member.write(chunk)
+        entries.append(HashReportEntry(path=Path(name), sha256=digest.hexdigest()))
+
+    try:
+        with archive_path.open("wb") as handle:
+            writer = _HashingWriter(handle)
+            with zipfile.ZipFile(writer, "w", allowZip64=True) as zip_file:
+                add_member(zip_file, clip_name, clip_chunks)
+                metadata_text = json.dumps(metadata, ensure_ascii=False, indent=2)
+                add_member(zip_file, "metadata.json", [metadata_text.encode("utf-8")])
+                clip_entry = AuditEntry(event="evidence_export", message=f"Hash: {entries[0].sha256}")
+                audit_text = "".join(format_audit_entry(entry) for entry in (*audit_entries, clip_entry))
+                add_member(zip_file, "audit.log", [audit_text.encode("utf-8")])
+                hash_report = HashReport(entries=tuple(entries))
+                add_member(zip_file, "hashes.csv", [format_hash_report(hash_report).encode("utf-8")])
+            archive_sha256 = writer.hexdigest()
+    except BaseException:
+        # Nie zostawiamy uciętego archiwum, które wyglądałoby na kompletny materiał dowodowy.
+        archive_path.unlink(missing_ok=True)
+        raise
+
+    checksum_path = archive_path.with_name(archive_path.name + ".sha256")
+    checksum_path.write_text(f"{archive_sha256}  {archive_path.name}\n", encoding="utf-8")
+
+    return EvidenceArchive(
+        archive_path=archive_path,
+        archive_sha256=archive_sha256,
+        checksum_path=checksum_path,
+        hash_report=hash_report,
+    )
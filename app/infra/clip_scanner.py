@@ -1,22 +1,28 @@
 from __future__ import annotations
 
+import time
+from bisect import bisect_right
 from collections import defaultdict
+from dataclasses import replace
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Iterable
 
 from app.domain.interfaces import ClipScanner, ScanProgress
 from app.domain.models import CameraClipIndex, ScanErrorItem, ScanReport, ScanSkippedItem, VideoClip
 from app.infra.duration_probe import DurationProbe, FFprobeDurationProbe
 from app.infra.filename_parser import parse_timestamp_from_name, supported_extensions
-from app.infra.scan_cache import ScanCache
+from app.infra.scan_cache import ClipCache
+
+# Co ile sekund zapisywać cache w trakcie skanowania (sidecar zapisuje się tylko przy flush).
+CACHE_FLUSH_INTERVAL_SECONDS = 30.0
 
 
 class FileSystemClipScanner(ClipScanner):
     def __init__(
         self,
         duration_probe: DurationProbe | None = None,
-        cache: ScanCache | None = None,
+        cache: ClipCache | None = None,
     ) -> None:
         self._duration_probe = duration_probe or FFprobeDurationProbe()
         self._cache = cache
@@ -34,7 +40,18 @@ class FileSystemClipScanner(ClipScanner):
         if not root.exists():
             raise FileNotFoundError(f"Root directory not found: {root}")
 
-        candidates = [path for path in root.rglob("*") if path.is_file()]
+        candidates: list[Path] = []
+        for path in root.rglob("*"):
+            if path.is_file():
+                candidates.append(path)
+                if len(candidates) % 1000 == 0:
+                    progress_callback(
+                        ScanProgress(
+                            processed=0,
+                            total=len(candidates),
+                            message=f"Wyszukiwanie plików: {len(candidates)}",
+                        )
+                    )
         total_files = len(candidates)
         video_extensions = {ext.lower() for ext in supported_extensions()}
 
@@ -44,19 +61,95 @@ class FileSystemClipScanner(ClipScanner):
         processed = 0
         candidate_video_files = 0
 
-        for path in candidates:
-            if should_cancel():
-                break
-            processed += 1
-            if processed % 25 == 0 or processed == total_files:
-                progress_callback(
-                    ScanProgress(
-                        processed=processed,
-                        total=total_files,
-                        message=f"Przetwarzanie: {path.name}",
+        last_flush = time.monotonic()
+        try:
+            for path in candidates:
+                if should_cancel():
+                    break
+                processed += 1
+                if processed % 25 == 0 or processed == total_files:
+                    progress_callback(
+                        ScanProgress(
+                            processed=processed,
+                            total=total_files,
+                            message=f"Przetwarzanie: {path.name}",
+                        )
+                    )
+
+                if path.suffix.lower() not in video_extensions:
+                    skipped.append(ScanSkippedItem(path=path, reason="Nieobsługiwane rozszerzenie"))
+                    continue
+                candidate_video_files += 1
+
+                cached_clip = self._cache.load(path, timezone_name) if self._cache else None
+                if cached_clip is not None:
+                    clips.append(
+                        VideoClip(
+                            path=cached_clip.path,
+                            camera_label=cached_clip.camera_label,
+                            start_time=cached_clip.start_time,
+                            end_time=cached_clip.start_time + timedelta(seconds=cached_clip.duration_seconds),
+                            duration=timedelta(seconds=cached_clip.duration_seconds),
+                        )
                     )
+                    continue
+
+                parsed = parse_timestamp_from_name(path, timezone_name)
+                if parsed is None:
+                    skipped.append(ScanSkippedItem(path=path, reason="Brak znacznika czasu w nazwie pliku"))
+                    continue
+
+                duration_result = self._duration_probe.probe(path)
+                if duration_result is None:
+                    errors.append(
+                        ScanErrorItem(path=path, message="Nie udało się odczytać długości klipu")
+                    )
+                    duration_seconds = 0.0
+                else:
+                    duration_seconds = duration_result.duration_seconds
+                duration = timedelta(seconds=duration_seconds)
+                clip = VideoClip(
+                    path=path,
+                    camera_label=parsed.camera_label,
+                    start_time=parsed.timestamp,
+                    end_time=parsed.timestamp + duration,
+                    duration=duration,
                 )
+                clips.append(clip)
+                if self._cache:
+                    self._cache.save(clip, timezone_name)
+                    # Okresowy zapis: przerwany lub porzucony skan nie traci wyników ffprobe.
+                    if time.monotonic() - last_flush >= CACHE_FLUSH_INTERVAL_SECONDS:
+                        self._cache.flush()
+                        last_flush = time.monotonic()
+        finally:
+            if self._cache:
+                self._cache.flush()
+
+        report = ScanReport(
+            total_files=total_files,
+            candidate_video_files=candidate_video_files,
+            indexed_clips=len(clips),
+            camera_indexes=build_camera_indexes(clips),
+            skipped=tuple(skipped),
+            errors=tuple(errors),
+            finished_at=datetime.now(timezone.utc),
+        )
+        return report
+
+    def scan_provisional(self, root: Path, timezone_name: str) -> ScanReport:
+        if not root.exists():
+            raise FileNotFoundError(f"Root directory not found: {root}")
 
+        candidates = [path for path in root.rglob("*") if path.is_file()]
+        video_extensions = {ext.lower() for ext in supported_extensions()}
+
+        skipped: list[ScanSkippedItem] = []
+        exact: list[VideoClip] = []
+        pending: list[VideoClip] = []
+        candidate_video_files = 0
+
+        for path in candidates:
             if path.suffix.lower() not in video_extensions:
                 skipped.append(ScanSkippedItem(path=path, reason="Nieobsługiwane rozszerzenie"))
                 continue
@@ -64,13 +157,14 @@ class FileSystemClipScanner(ClipScanner):
 
             cached_clip = self._cache.load(path, timezone_name) if self._cache else None
             if cached_clip is not None:
-                clips.append(
+                duration = timedelta(seconds=cached_clip.duration_seconds)
+                exact.append(
                     VideoClip(
                         path=cached_clip.path,
                         camera_label=cached_clip.camera_label,
                         start_time=cached_clip.start_time,
-                        end_time=cached_clip.start_time + timedelta(seconds=cached_clip.duration_seconds),
-                        duration=timedelta(seconds=cached_clip.duration_seconds),
+                        end_time=cached_clip.start_time + duration,
+                        duration=duration,
                     )
                 )
                 continue
@@ -79,46 +173,64 @@ class FileSystemClipScanner(ClipScanner):
             if parsed is None:
                 skipped.append(ScanSkippedItem(path=path, reason="Brak znacznika czasu w nazwie pliku"))
                 continue
-
-            duration_result = self._duration_probe.probe(path)
-            if duration_result is None:
-                errors.append(
-                    ScanErrorItem(path=path, message="Nie udało się odczytać długości klipu")
+            pending.append(
+                VideoClip(
+                    path=path,
+                    camera_label=parsed.camera_label,
+                    start_time=parsed.timestamp,
+                    end_time=parsed.timestamp,
+                    duration=timedelta(0),
+                    provisional=True,
                 )
-                duration_seconds = 0.0
-            else:
-                duration_seconds = duration_result.duration_seconds
-            duration = timedelta(seconds=duration_seconds)
-            clip = VideoClip(
-                path=path,
-                camera_label=parsed.camera_label,
-                start_time=parsed.timestamp,
-                end_time=parsed.timestamp + duration,
-                duration=duration,
-            )
-            clips.append(clip)
-            if self._cache:
-                self._cache.save(clip, timezone_name)
-
-        camera_map: dict[str, list[VideoClip]] = defaultdict(list)
-        for clip in clips:
-            camera_map[clip.camera_label].append(clip)
-
-        camera_indexes = tuple(
-            CameraClipIndex(
-                camera_label=camera_label,
-                clips=tuple(sorted(items, key=lambda item: item.start_time, reverse=True)),
             )
-            for camera_label, items in sorted(camera_map.items())
-        )
 
-        report = ScanReport(
-            total_files=total_files,
+        clips = exact + _estimate_provisional_ends(exact, pending)
+        return ScanReport(
+            total_files=len(candidates),
             candidate_video_files=candidate_video_files,
             indexed_clips=len(clips),
-            camera_indexes=camera_indexes,
+            camera_indexes=build_camera_indexes(clips),
             skipped=tuple(skipped),
-            errors=tuple(errors),
             finished_at=datetime.now(timezone.utc),
         )
-        return report
+
+
+def build_camera_indexes(clips: Iterable[VideoClip]) -> tuple[CameraClipIndex, ...]:
+    camera_map: dict[str, list[VideoClip]] = defaultdict(list)
+    for clip in clips:
+        camera_map[clip.camera_label].append(clip)
+
+    return tuple(
+        CameraClipIndex(
+            camera_label=camera_label,
+            clips=tuple(sorted(items, key=lambda item: item.start_time, reverse=True)),
+        )
+        for camera_label, items in sorted(camera_map.items())
+    )
+
+
+def _estimate_provisional_ends(exact: list[VideoClip], pending: list[VideoClip]) -> list[VideoClip]:
+    # Koniec klipu bez sondy ffprobe = początek następnego klipu tej samej kamery.
+    starts: dict[str, list[datetime]] = defaultdict(list)
+    for clip in exact + pending:
+        starts[clip.camera_label].append(clip.start_time)
+    for camera_starts in starts.values():
+        camera_starts.sort()
+
+    gaps: dict[str, timedelta] = {}
+    for camera_label, camera_starts in starts.items():
+        deltas = sorted(
+            later - earlier for earlier, later in zip(camera_starts, camera_starts[1:]) if later > earlier
+        )
+        gaps[camera_label] = deltas[len(deltas) // 2] if deltas else timedelta(0)
+
+    estimated: list[VideoClip] = []
+    for clip in pending:
+        camera_starts = starts[clip.camera_label]
+        position = bisect_right(camera_starts, clip.start_time)
+        if position < len(camera_starts):
+            end_time = camera_starts[position]
+        else:
+            end_time = clip.start_time + gaps[clip.camera_label]
+        estimated.append(replace(clip, end_time=end_time, duration=end_time - clip.start_time))
+    return estimated
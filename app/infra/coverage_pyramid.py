@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import bisect
+import io
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from app.domain.models import CameraClipIndex, VideoClip
+from app.infra.scan_cache import ClipCache
+
+PYRAMID_VERSION = 2
+_MINUTE = 60
+_HOUR = 3600
+_DAY = 86400
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("numpy nie jest dostępny")
+
+
+def _clip_interval(clip: VideoClip) -> tuple[int, int]:
+    start = math.floor(clip.start_time.timestamp())
+    end = math.ceil(clip.end_time.timestamp())
+    return start, max(end, start + 1)
+
+
+def _days_of(interval: tuple[int, int]) -> range:
+    start, end = interval
+    return range(start // _DAY, (end - 1) // _DAY + 1)
+
+
+def _stack(arrays: list[np.ndarray], width: int, dtype: type) -> np.ndarray:
+    return np.stack(arrays) if arrays else np.zeros((0, width), dtype=dtype)
+
+
+@dataclass(frozen=True)
+class _DayBlock:
+    # Jedna doba: bity zajętości sekund oraz liczba zajętych sekund na minutę i godzinę.
+    seconds: np.ndarray
+    minutes: np.ndarray
+    hours: np.ndarray
+
+    @classmethod
+    def from_occupied(cls, occupied: np.ndarray) -> _DayBlock:
+        minutes = occupied.reshape(-1, _MINUTE).sum(axis=1, dtype=np.uint8)
+        hours = minutes.reshape(-1, _HOUR // _MINUTE).sum(axis=1, dtype=np.uint16)
+        return cls(seconds=np.packbits(occupied), minutes=minutes, hours=hours)
+
+    @property
+    def total(self) -> int:
+        return int(self.hours.sum(dtype=np.int64))
+
+    def is_occupied(self, offset: int) -> bool:
+        return bool((self.seconds[offset // 8] >> (7 - offset % 8)) & 1)
+
+    def occupied_before(self, offset: int) -> int:
+        # Pełne godziny, pełne minuty, reszta sekunda po sekundzie - bez zaokrąglania do kubełków.
+        hour, minute = offset // _HOUR, offset // _MINUTE
+        value = int(self.hours[:hour].sum(dtype=np.int64))
+        value += int(self.minutes[hour * (_HOUR // _MINUTE) : minute].sum(dtype=np.int64))
+        minute_start = minute * _MINUTE
+        if offset > minute_start:
+            bits = np.unpackbits(self.seconds[minute_start // 8 : -(-offset // 8)])
+            skip = minute_start % 8
+            value += int(bits[skip : skip + offset - minute_start].sum(dtype=np.int64))
+        return value
+
+
+class CoveragePyramid:
+    def __init__(self, intervals: dict[str, tuple[int, int]]) -> None:
+        _require_numpy()
+        self._intervals = dict(intervals)
+        # Tylko doby, w których jest nagranie - klip z zegarem z 2000 r. to jeden blok, nie 24 lata.
+        self._days: dict[int, _DayBlock] = {}
+        self._day_index: tuple[list[int], list[int]] | None = None
+        self._fill_days({day for interval in self._intervals.values() for day in _days_of(interval)})
+
+    @classmethod
+    def from_clips(cls, clips: Iterable[VideoClip]) -> CoveragePyramid:
+        return cls({str(clip.path): _clip_interval(clip) for clip in clips})
+
+    @property
+    def day_count(self) -> int:
+        return len(self._days)
+
+    def _fill_days(self, days: set[int]) -> None:
+        if not days:
+            return
+        grouped: dict[int, list[tuple[int, int]]] = {day: [] for day in days}
+        for interval in self._intervals.values():
+            for day in _days_of(interval):
+                if day in grouped:
+                    grouped[day].append(interval)
+        for day, intervals in grouped.items():
+            self._fill_day(day, intervals)
+        self._day_index = None
+
+    def _fill_day(self, day: int, intervals: list[tuple[int, int]]) -> None:
+        # Tablica różnicowa tylko dla jednej doby -> zajętość sekund -> kubełki minut i godzin.
+        if not intervals:
+            self._days.pop(day, None)
+            return
+        base = day * _DAY
+        bounds = np.clip(np.array(intervals, dtype=np.int64) - base, 0, _DAY)
+        diff = np.zeros(_DAY + 1, dtype=np.int32)
+        np.add.at(diff, bounds[:, 0], 1)
+        np.add.at(diff, bounds[:, 1], -1)
+        self._days[day] = _DayBlock.from_occupied(np.cumsum(diff[:-1]) > 0)
+
+    def _update(self, intervals: Iterable[tuple[int, int]]) -> None:
+        self._fill_days({day for interval in intervals for day in _days_of(interval)})
+
+    def add(self, clip: VideoClip) -> None:
+        interval = _clip_interval(clip)
+        previous = self._intervals.get(str(clip.path))
+        self._intervals[str(clip.path)] = interval
+        self._update([interval] if previous is None else [interval, previous])
+
+    def remove(self, clip: VideoClip) -> None:
+        interval = self._intervals.pop(str(clip.path), None)
+        if interval is not None:
+            self._update([interval])
+
+    def sync(self, clips: Iterable[VideoClip]) -> bool:
+        current = {str(clip.path): _clip_interval(clip) for clip in clips}
+        affected: list[tuple[int, int]] = []
+        for key in [key for key in self._intervals if key not in current]:
+            affected.append(self._intervals.pop(key))
+        for key, interval in current.items():
+            previous = self._intervals.get(key)
+            if previous != interval:
+                self._intervals[key] = interval
+                affected.append(interval)
+                if previous is not None:
+                    affected.append(previous)
+        if affected:
+            self._update(affected)
+        return bool(affected)
+
+    def _prefix(self) -> tuple[list[int], list[int]]:
+        # Sumy prefiksowe po dobach: prefix[i] = zajęte sekundy we wszystkich dobach przed days[i].
+        if self._day_index is None:
+            days = sorted(self._days)
+            prefix = [0]
+            for day in days:
+                prefix.append(prefix[-1] + self._days[day].total)
+            self._day_index = (days, prefix)
+        return self._day_index
+
+    def _occupied_before(self, moment: float) -> float:
+        days, prefix = self._prefix()
+        second = math.floor(moment)
+        day, offset = divmod(second, _DAY)
+        value = float(prefix[bisect.bisect_left(days, day)])
+        block = self._days.get(day)
+        if block is not None:
+            value += block.occupied_before(offset)
+            if block.is_occupied(offset):
+                value += moment - second
+        return value
+
+    def coverage(self, start: datetime, end: datetime, columns: int) -> np.ndarray:
+        # Krawędzie kolumn liczone dokładnie: pełne doby z prefiksu, części z godzin, minut i sekund.
+        columns = max(1, columns)
+        first = start.timestamp()
+        width = (end.timestamp() - first) / columns
+        if not self._days or width <= 0:
+            return np.zeros(columns, dtype=np.float32)
+        edges = first + width * np.arange(columns + 1)
+        occupied = np.fromiter((self._occupied_before(float(edge)) for edge in edges), dtype=np.float64)
+        return np.clip(np.diff(occupied) / width, 0.0, 1.0).astype(np.float32)
+
+    def to_bytes(self) -> bytes:
+        days = sorted(self._days)
+        blocks = [self._days[day] for day in days]
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            version=np.array([PYRAMID_VERSION]),
+            keys=np.array(list(self._intervals), dtype=np.str_),
+            starts=np.array([start for start, _ in self._intervals.values()], dtype=np.int64),
+            ends=np.array([end for _, end in self._intervals.values()], dtype=np.int64),
+            days=np.array(days, dtype=np.int64),
+            seconds=_stack([block.seconds for block in blocks], _DAY // 8, np.uint8),
+            minutes=_stack([block.minutes for block in blocks], _DAY // _MINUTE, np.uint8),
+            hours=_stack([block.hours for block in blocks], _DAY // _HOUR, np.uint16),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> CoveragePyramid:
+        _require_numpy()
+        with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+            if int(data["version"][0]) != PYRAMID_VERSION:
+                raise ValueError("Nieobsługiwana wersja piramidy pokrycia")
+            pyramid = cls.__new__(cls)
+            pyramid._intervals = {
+                str(key): (int(start), int(end))
+                for key, start, end in zip(data["keys"], data["starts"], data["ends"])
+            }
+            blocks = zip(data["days"], data["seconds"], data["minutes"], data["hours"])
+            pyramid._days = {
+                int(day): _DayBlock(seconds=seconds.copy(), minutes=minutes.copy(), hours=hours.copy())
+                for day, seconds, minutes, hours in blocks
+            }
+            pyramid._day_index = None
+        return pyramid
+
+
+def load_coverage_pyramid(index: CameraClipIndex, store: ClipCache | None = None) -> CoveragePyramid:
+    payload = store.load_coverage(index.camera_label) if store else None
+    pyramid: CoveragePyramid | None = None
+    if payload is not None:
+        try:
+            pyramid = CoveragePyramid.from_bytes(payload)
+        except (ValueError, KeyError, OSError):
+            pyramid = None
+    if pyramid is None:
+        pyramid = CoveragePyramid.from_clips(index.clips)
+        changed = True
+    else:
+        changed = pyramid.sync(index.clips)
+    if store and changed:
+        store.save_coverage(index.camera_label, pyramid.to_bytes())
+    return pyramid
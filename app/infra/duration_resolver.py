@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from dataclasses import replace
+from datetime import timedelta
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from app.domain.models import CameraClipIndex, ScanErrorItem, VideoClip
+from app.infra.clip_scanner import build_camera_indexes
+from app.infra.duration_probe import DurationProbe, FFprobeDurationProbe
+from app.infra.scan_cache import ClipCache
+
+
+class LazyDurationResolver:
+    def __init__(
+        self,
+        clips: Iterable[VideoClip],
+        timezone_name: str,
+        duration_probe: DurationProbe | None = None,
+        cache: ClipCache | None = None,
+        on_resolved: Callable[[VideoClip], None] | None = None,
+        max_workers: int = 2,
+    ) -> None:
+        self._timezone_name = timezone_name
+        self._duration_probe = duration_probe or FFprobeDurationProbe()
+        self._cache = cache
+        self._on_resolved = on_resolved
+        self._max_workers = max(1, max_workers)
+
+        self._lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._clips: dict[Path, VideoClip] = {}
+        self._dropped: dict[Path, VideoClip] = {}
+        self._in_flight: dict[Path, threading.Event] = {}
+        self._errors: list[ScanErrorItem] = []
+        self._queue: list[tuple[float, int, Path]] = []
+        self._sequence = 0
+        self._stopping = threading.Event()
+        self._workers: list[threading.Thread] = []
+
+        for clip in clips:
+            self._clips[clip.path] = clip
+            if clip.provisional:
+                self._push(clip.path, -clip.start_time.timestamp())
+
+    def _push(self, path: Path, priority: float) -> None:
+        self._sequence += 1
+        heapq.heappush(self._queue, (priority, self._sequence, path))
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for clip in self._clips.values() if clip.provisional)
+
+    @property
+    def errors(self) -> tuple[ScanErrorItem, ...]:
+        with self._lock:
+            return tuple(self._errors)
+
+    def camera_indexes(self) -> tuple[CameraClipIndex, ...]:
+        with self._lock:
+            clips = list(self._clips.values())
+        return build_camera_indexes(clips)
+
+    def start(self) -> None:
+        for number in range(self._max_workers):
+            worker = threading.Thread(
+                target=self._work,
+                name=f"mtv-duration-{number}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def wait(self) -> None:
+        for worker in self._workers:
+            worker.join()
+        self._workers.clear()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self.wait()
+        if self._cache:
+            with self._cache_lock:
+                self._cache.flush()
+
+    def prioritize(self, clip: VideoClip) -> None:
+        with self._lock:
+            current = self._clips.get(clip.path)
+            if current is not None and current.provisional:
+                self._push(clip.path, float("-inf"))
+
+    def resolve(self, clip: VideoClip) -> VideoClip:
+        while True:
+            with self._lock:
+                current = self._clips.get(clip.path) or self._dropped.get(clip.path) or clip
+                if not current.provisional:
+                    return current
+                event = self._in_flight.get(clip.path)
+                if event is None:
+                    event = threading.Event()
+                    self._in_flight[clip.path] = event
+                    owner = True
+                else:
+                    owner = False
+            if owner:
+                return self._probe_and_store(current, event)
+            event.wait()
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            with self._lock:
+                path: Optional[Path] = None
+                while self._queue:
+                    _, _, candidate = heapq.heappop(self._queue)
+                    clip = self._clips.get(candidate)
+                    if clip is not None and clip.provisional and candidate not in self._in_flight:
+                        path = candidate
+                        event = threading.Event()
+                        self._in_flight[candidate] = event
+                        break
+                if path is None:
+                    return
+            self._probe_and_store(clip, event)
+
+    def _probe_and_store(self, clip: VideoClip, event: threading.Event) -> VideoClip:
+        dropped = False
+        try:
+            try:
+                result = self._duration_probe.probe(clip.path)
+                if result is None:
+                    resolved = replace(clip, end_time=clip.start_time, duration=timedelta(0), provisional=False)
+                else:
+                    duration = timedelta(seconds=result.duration_seconds)
+                    resolved = replace(
+                        clip,
+                        end_time=clip.start_time + duration,
+                        duration=duration,
+                        provisional=False,
+                    )
+                if self._cache:
+                    with self._cache_lock:
+                        self._cache.save(resolved, self._timezone_name)
+            except OSError as exc:
+                # Rejestrator mógł usunąć najstarszy plik między wstępnym indeksem a ffprobe.
+                dropped = True
+                resolved = replace(clip, end_time=clip.start_time, duration=timedelta(0), provisional=False)
+                with self._lock:
+                    self._clips.pop(clip.path, None)
+                    self._dropped[clip.path] = resolved
+                    self._errors.append(ScanErrorItem(path=clip.path, message="Klip niedostępny", context=str(exc)))
+            else:
+                with self._lock:
+                    self._clips[clip.path] = resolved
+                    if result is None:
+                        self._errors.append(
+                            ScanErrorItem(path=clip.path, message="Nie udało się odczytać długości klipu")
+                        )
+        finally:
+            with self._lock:
+                self._in_flight.pop(clip.path, None)
+            event.set()
+        if self._on_resolved is not None and not dropped:
+            self._on_resolved(resolved)
+        return resolved
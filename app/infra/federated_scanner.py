@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, wait
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Sequence
+
+from app.domain.interfaces import ClipScanner, MultiRootClipScanner
+from app.domain.models import CameraClipIndex, ScanErrorItem, ScanReport, ScanSkippedItem
+
+
+# Po przekroczeniu czasu skaner dostaje sygnał anulowania i tyle sekund na zapisanie cache.
+CANCEL_GRACE_SECONDS = 5.0
+# Domyślny limit bezczynności: duży, ale zdrowy katalog stale robi postęp, zawieszony udział nie.
+DEFAULT_IDLE_TIMEOUT_SECONDS = 120.0
+
+
+def unique_roots(roots: Sequence[Path]) -> list[Path]:
+    # Bez resolve(): na zawieszonym udziale sieciowym samo rozwiązanie ścieżki może zawisnąć.
+    seen: set[str] = set()
+    result: list[Path] = []
+    for root in roots:
+        key = os.path.normcase(os.path.abspath(root))
+        if key not in seen:
+            seen.add(key)
+            result.append(root)
+    return result
+
+
+def root_labels(roots: Sequence[Path]) -> dict[Path, str]:
+    # Nazwa katalogu, a przy powtórzeniach kolejne katalogi nadrzędne: "a/nagrania", "b/nagrania".
+    parts = {root: [part for part in root.parts if part != root.anchor] or [str(root)] for root in roots}
+    depth = {root: 1 for root in parts}
+    while True:
+        labels = {root: "/".join(parts[root][-depth[root] :]) for root in parts}
+        counts = Counter(labels.values())
+        growing = [root for root in parts if counts[labels[root]] > 1 and depth[root] < len(parts[root])]
+        if not growing:
+            return {root: str(root) if counts[label] > 1 else label for root, label in labels.items()}
+        for root in growing:
+            depth[root] += 1
+
+
+class _RootScan:
+    def __init__(self) -> None:
+        self.cancel = threading.Event()
+        self.last_activity = time.monotonic()
+
+    def touch(self) -> None:
+        self.last_activity = time.monotonic()
+
+    def should_cancel(self) -> bool:
+        # Skaner pyta o anulowanie przed każdym plikiem - to też znak, że katalog robi postęp.
+        self.touch()
+        return self.cancel.is_set()
+
+
+class FederatedClipScanner(MultiRootClipScanner):
+    def __init__(
+        self,
+        scanner_factory: Callable[[Path], ClipScanner],
+        timeout_seconds: float | None = DEFAULT_IDLE_TIMEOUT_SECONDS,
+    ) -> None:
+        # timeout_seconds: ile sekund katalog może nie robić postępu, zanim zostanie pominięty.
+        self._scanner_factory = scanner_factory
+        self._timeout_seconds = timeout_seconds
+
+    def _start(self, root: Path, timezone_name: str) -> tuple[_RootScan, Future[ScanReport]]:
+        state = _RootScan()
+        future: Future[ScanReport] = Future()
+
+        def run() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                # Tworzenie skanera (cache SQLite w katalogu) też może zawisnąć na niedostępnym udziale.
+                report = self._scanner_factory(root).scan_with_progress(
+                    root,
+                    timezone_name,
+                    lambda _: state.touch(),
+                    state.should_cancel,
+                )
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(report)
+
+        # Wątki demona: zawieszony udział sieciowy nie blokuje zakończenia programu.
+        threading.Thread(target=run, name=f"mtv-scan-{root.name}", daemon=True).start()
+        return state, future
+
+    def _wait(self, state: _RootScan, future: Future[ScanReport]) -> ScanReport:
+        if self._timeout_seconds is None:
+            return future.result()
+        while True:
+            idle = time.monotonic() - state.last_activity
+            try:
+                return future.result(timeout=max(0.0, self._timeout_seconds - idle))
+            except FutureTimeoutError:
+                if time.monotonic() - state.last_activity < self._timeout_seconds:
+                    continue
+                # Anulowany skaner kończy na najbliższym pliku i zapisuje dotychczasowe wyniki do cache.
+                state.cancel.set()
+                wait([future], timeout=CANCEL_GRACE_SECONDS)
+                raise
+
+    def scan_roots(self, roots: Sequence[Path], timezone_name: str) -> ScanReport:
+        started_at = datetime.now(timezone.utc)
+        roots = unique_roots(roots)
+        labels = root_labels(roots)
+        scans = [(root, *self._start(root, timezone_name)) for root in roots]
+
+        total_files = 0
+        candidate_video_files = 0
+        camera_indexes: list[CameraClipIndex] = []
+        skipped: list[ScanSkippedItem] = []
+        errors: list[ScanErrorItem] = []
+
+        for root, state, future in scans:
+            try:
+                report = self._wait(state, future)
+            except FutureTimeoutError:
+                errors.append(
+                    ScanErrorItem(
+                        path=root,
+                        message=f"Brak postępu skanowania przez {self._timeout_seconds:g} s",
+                        context=str(root),
+                    )
+                )
+                continue
+            except Exception as exc:
+                errors.append(ScanErrorItem(path=root, message="Nie udało się zeskanować katalogu", context=str(exc)))
+                continue
+
+            total_files += report.total_files
+            candidate_video_files += report.candidate_video_files
+            skipped.extend(report.skipped)
+            errors.extend(report.errors)
+            for index in report.camera_indexes:
+                camera_indexes.append(
+                    CameraClipIndex(
+                        camera_label=index.camera_label,
+                        clips=tuple(replace(clip, source_root=root) for clip in index.clips),
+                        source_root=root,
+                        source_label=labels[root],
+                    )
+                )
+
+        camera_indexes.sort(key=lambda item: (item.camera_label, str(item.source_root)))
+        return ScanReport(
+            total_files=total_files,
+            candidate_video_files=candidate_video_files,
+            indexed_clips=sum(len(index.clips) for index in camera_indexes),
+            camera_indexes=tuple(camera_indexes),
+            skipped=tuple(skipped),
+            errors=tuple(errors),
+            started_at=started_at,
+            finished_at=datetime.now(timezone.utc),
+        )
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from app.domain.models import CameraClipIndex, HashReport, ScanErrorItem, VideoClip
+from app.infra.audit_log import AuditEntry, AuditLogger
+from app.infra.clip_exporter import write_hash_report, write_metadata
+from app.infra.hash_calculator import Sha256HashCalculator
+
+
+@dataclass(frozen=True)
+class CameraSnapshot:
+    camera_label: str
+    clip_path: Path
+    image_path: Path
+    offset_seconds: float
+
+
+@dataclass(frozen=True)
+class SnapshotReport:
+    moment: datetime
+    output_dir: Path
+    snapshots: tuple[CameraSnapshot, ...]
+    hash_report: HashReport
+    errors: tuple[ScanErrorItem, ...] = field(default_factory=tuple)
+
+
+class FrameSnapshotter:
+    def __init__(self, ffmpeg_executable: str = "ffmpeg") -> None:
+        self._ffmpeg_executable = ffmpeg_executable
+
+    def is_available(self) -> bool:
+        return shutil.which(self._ffmpeg_executable) is not None
+
+    def extract_frame(self, input_path: Path, offset_seconds: float, output_path: Path) -> None:
+        if not self.is_available():
+            raise RuntimeError("ffmpeg nie jest dostępny")
+        # -ss przed -i: skok do najbliższej klatki kluczowej, dekodowanie tylko do celu.
+        subprocess.run(
+            [
+                self._ffmpeg_executable,
+                "-y",
+                "-v",
+                "error",
+                "-threads",
+                "1",
+                "-ss",
+                f"{max(0.0, offset_seconds):.3f}",
+                "-i",
+                str(input_path),
+                "-frames:v",
+                "1",
+                "-an",
+                str(output_path),
+            ],
+            check=True,
+            capture_output=True,
+        )
+
+
+def _safe_name(label: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", label).strip("_") or "Camera"
+
+
+def take_snapshots(
+    camera_indexes: Iterable[CameraClipIndex],
+    moment: datetime,
+    output_dir: Path,
+    snapshotter: FrameSnapshotter | None = None,
+    clip_resolver: Callable[[CameraClipIndex, datetime], Optional[VideoClip]] | None = None,
+    max_workers: int | None = None,
+) -> SnapshotReport:
+    snapshotter = snapshotter or FrameSnapshotter()
+    if not snapshotter.is_available():
+        raise RuntimeError("ffmpeg nie jest dostępny")
+    resolve = clip_resolver or (lambda index, at: index.clip_for_time(at))
+
+    indexes = list(camera_indexes)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # Nazwy plików ustalane przed dekodowaniem: ta sama kamera z dwóch katalogów nie nadpisze zrzutu.
+    image_names: list[str] = []
+    for index in indexes:
+        stem = f"{_safe_name(index.qualified_label)}_{moment:%Y%m%d_%H%M%S}"
+        name, number = f"{stem}.png", 1
+        while name in image_names:
+            number += 1
+            name = f"{stem}_{number}.png"
+        image_names.append(name)
+
+    def capture(
+        index: CameraClipIndex,
+        image_name: str,
+    ) -> tuple[Optional[CameraSnapshot], Optional[ScanErrorItem]]:
+        # Rozwiązanie klipu (przy --lazy: ffprobe) też w puli, żeby kamery nie czekały na siebie.
+        clip = resolve(index, moment)
+        if clip is None:
+            return None, None
+        snapshot = CameraSnapshot(
+            camera_label=index.qualified_label,
+            clip_path=clip.path,
+            image_path=output_dir / image_name,
+            offset_seconds=(moment - clip.start_time).total_seconds(),
+        )
+        snapshot.image_path.unlink(missing_ok=True)
+        try:
+            snapshotter.extract_frame(snapshot.clip_path, snapshot.offset_seconds, snapshot.image_path)
+        except subprocess.CalledProcessError as exc:
+            stderr = exc.stderr.decode("utf-8", errors="replace").strip() if exc.stderr else None
+            return None, ScanErrorItem(
+                path=snapshot.clip_path,
+                message="Nie udało się zdekodować klatki",
+                context=stderr,
+            )
+        except OSError as exc:
+            return None, ScanErrorItem(
+                path=snapshot.clip_path,
+                message="Nie udało się zdekodować klatki",
+                context=str(exc),
+            )
+        if not snapshot.image_path.exists() or snapshot.image_path.stat().st_size == 0:
+            # ffmpeg kończy się sukcesem bez klatki, gdy przesunięcie wypada na/za końcem klipu.
+            snapshot.image_path.unlink(missing_ok=True)
+            return None, ScanErrorItem(
+                path=snapshot.clip_path,
+                message="Brak klatki dla podanego czasu",
+                context=f"offset {snapshot.offset_seconds:.3f}s",
+            )
+        return snapshot, None
+
+    workers = max_workers or min(len(indexes), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(capture, indexes, image_names))
+
+    snapshots = tuple(snapshot for snapshot, _ in results if snapshot is not None)
+    errors = tuple(error for _, error in results if error is not None)
+
+    hash_report = Sha256HashCalculator().compute_hashes(snapshot.image_path for snapshot in snapshots)
+    write_hash_report(hash_report, output_dir / "hashes.csv")
+    write_metadata(
+        output_dir / "metadata.json",
+        {
+            "moment": moment.isoformat(),
+            "snapshots": [
+                {
+                    "camera": snapshot.camera_label,
+                    "source": str(snapshot.clip_path),
+                    "offset_seconds": snapshot.offset_seconds,
+                    "image": str(snapshot.image_path),
+                }
+                for snapshot in snapshots
+            ],
+        },
+    )
+
+    logger = AuditLogger(output_dir / "audit.log")
+    logger.write_many(
+        AuditEntry(
+            event="snapshot",
+            message=f"{snapshot.camera_label} @ {moment.isoformat()} | {snapshot.clip_path} | {entry.sha256}",
+        )
+        for snapshot, entry in zip(snapshots, hash_report.entries)
+    )
+    logger.write_many(
+        AuditEntry(event="snapshot_error", message=f"{error.path}: {error.message}") for error in errors
+    )
+
+    return SnapshotReport(
+        moment=moment,
+        output_dir=output_dir,
+        snapshots=snapshots,
+        hash_report=hash_report,
+        errors=errors,
+    )
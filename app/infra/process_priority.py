@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import os
+import shutil
+import subprocess
+import sys
+from typing import Any
+
+_BELOW_NORMAL_PRIORITY_CLASS = 0x00004000
+
+
+def lower_current_process_priority() -> None:
+    if hasattr(os, "nice"):
+        os.nice(10)
+        return
+    try:
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), _BELOW_NORMAL_PRIORITY_CLASS)
+    except (AttributeError, OSError):
+        pass
+
+
+def low_priority_command(command: list[str]) -> list[str]:
+    # Na POSIX przez "nice", nie preexec_fn: preexec_fn nie jest bezpieczne przy wielu wątkach.
+    if sys.platform == "win32":
+        return command
+    nice = shutil.which("nice")
+    return [nice, "-n", "10", *command] if nice else command
+
+
+def low_priority_subprocess_kwargs() -> dict[str, Any]:
+    if sys.platform == "win32":
+        return {"creationflags": getattr(subprocess, "BELOW_NORMAL_PRIORITY_CLASS", _BELOW_NORMAL_PRIORITY_CLASS)}
+    return {}
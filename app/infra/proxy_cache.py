@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.domain.models import VideoClip
+
+PROXY_INDEX_NAME = "proxies.json"
+PROXY_INDEX_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ProxyEntry:
+    source_path: str
+    proxy_name: str
+    source_size: int
+    source_mtime: float
+    proxy_size: int
+    duration_seconds: float
+    created_at: float
+    last_used: float
+
+
+@dataclass(frozen=True)
+class PlaybackSource:
+    clip: VideoClip
+    path: Path
+    is_proxy: bool
+
+    def to_source_offset(self, playback_offset_seconds: float) -> float:
+        # Proxy zachowuje oś czasu oryginału (ten sam początek, bez przycinania),
+        # więc przesunięcie w proxy = przesunięcie w pliku źródłowym.
+        duration = self.clip.duration.total_seconds()
+        offset = max(0.0, playback_offset_seconds)
+        return min(offset, duration) if duration > 0 else offset
+
+
+class ProxyCache:
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: dict[str, ProxyEntry] = {}
+        self._viewed: dict[str, float] = {}
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+        # Limit obowiązuje od razu, także po zmniejszeniu --max-size-gb, a nie dopiero przy nowym proxy.
+        with self._lock:
+            if self._evict_locked():
+                self._save()
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.proxy_size for entry in self._entries.values())
+
+    def _index_path(self) -> Path:
+        return self._directory / PROXY_INDEX_NAME
+
+    def _load(self) -> None:
+        path = self._index_path()
+        if not path.exists():
+            return
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+            if payload.get("version") != PROXY_INDEX_VERSION:
+                return
+            self._entries = {item["source_path"]: ProxyEntry(**item) for item in payload["entries"]}
+            self._viewed = {key: float(value) for key, value in payload.get("viewed", {}).items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._entries = {}
+            self._viewed = {}
+
+    def _save(self) -> None:
+        payload = {
+            "version": PROXY_INDEX_VERSION,
+            "entries": [asdict(entry) for entry in self._entries.values()],
+            "viewed": self._viewed,
+        }
+        temporary_path = self._index_path().with_suffix(".tmp")
+        temporary_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        temporary_path.replace(self._index_path())
+
+    def proxy_path_for(self, source_path: Path) -> Path:
+        digest = hashlib.sha256(str(source_path).encode("utf-8")).hexdigest()[:24]
+        return self._directory / f"{digest}.mp4"
+
+    def lookup(self, source_path: Path) -> Optional[ProxyEntry]:
+        with self._lock:
+            entry = self._entries.get(str(source_path))
+        if entry is None:
+            return None
+        try:
+            stat = source_path.stat()
+        except OSError:
+            return None
+        if stat.st_size != entry.source_size or stat.st_mtime != entry.source_mtime:
+            return None
+        if not (self._directory / entry.proxy_name).exists():
+            return None
+        return entry
+
+    def mark_viewed(self, source_path: Path) -> None:
+        with self._lock:
+            now = time.time()
+            self._viewed[str(source_path)] = now
+            entry = self._entries.get(str(source_path))
+            if entry is not None:
+                self._entries[entry.source_path] = ProxyEntry(**{**asdict(entry), "last_used": now})
+            self._save()
+
+    def last_viewed(self, source_path: Path) -> Optional[float]:
+        with self._lock:
+            return self._viewed.get(str(source_path))
+
+    def add(self, clip: VideoClip, proxy_path: Path) -> ProxyEntry:
+        stat = clip.path.stat()
+        now = time.time()
+        entry = ProxyEntry(
+            source_path=str(clip.path),
+            proxy_name=proxy_path.name,
+            source_size=stat.st_size,
+            source_mtime=stat.st_mtime,
+            proxy_size=proxy_path.stat().st_size,
+            duration_seconds=clip.duration.total_seconds(),
+            created_at=now,
+            last_used=max(now, self._viewed.get(str(clip.path), 0.0)),
+        )
+        with self._lock:
+            self._entries[entry.source_path] = entry
+            self._evict_locked(keep=entry.source_path)
+            self._save()
+        return entry
+
+    def _evict_locked(self, keep: str | None = None) -> int:
+        total = sum(entry.proxy_size for entry in self._entries.values())
+        evicted = 0
+        # Najpierw usuwane proxy nigdy nieoglądane, potem najdawniej używane.
+        ranked = sorted(
+            self._entries.values(),
+            key=lambda item: (item.source_path in self._viewed, item.last_used),
+        )
+        for entry in ranked:
+            if total <= self._max_bytes:
+                break
+            if entry.source_path == keep:
+                continue
+            (self._directory / entry.proxy_name).unlink(missing_ok=True)
+            del self._entries[entry.source_path]
+            total -= entry.proxy_size
+            evicted += 1
+        return evicted
+
+    def playback_source(self, clip: VideoClip) -> PlaybackSource:
+        entry = self.lookup(clip.path)
+        if entry is None:
+            return PlaybackSource(clip=clip, path=clip.path, is_proxy=False)
+        return PlaybackSource(clip=clip, path=self._directory / entry.proxy_name, is_proxy=True)
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import heapq
+import os
+import shutil
+import subprocess
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from app.domain.models import ScanErrorItem, VideoClip
+from app.infra.process_priority import low_priority_command, low_priority_subprocess_kwargs
+from app.infra.proxy_cache import ProxyCache
+
+
+@dataclass(frozen=True)
+class ProxySettings:
+    height: int = 360
+    gop_frames: int = 12
+    crf: int = 30
+    ffmpeg_threads: int = 2
+    max_workers: int = 1
+
+
+@dataclass(frozen=True)
+class ProxyReport:
+    generated: int
+    reused: int
+    errors: tuple[ScanErrorItem, ...] = field(default_factory=tuple)
+
+
+class ProxyGenerator:
+    def __init__(
+        self,
+        cache: ProxyCache,
+        settings: ProxySettings | None = None,
+        ffmpeg_executable: str = "ffmpeg",
+        on_generated: Callable[[VideoClip, Path], None] | None = None,
+    ) -> None:
+        self._cache = cache
+        self._settings = settings or ProxySettings()
+        self._ffmpeg_executable = ffmpeg_executable
+        self._on_generated = on_generated
+        self._lock = threading.Lock()
+        self._queue: list[tuple[int, float, int, VideoClip]] = []
+        self._queued: set[Path] = set()
+        self._sequence = 0
+        self._stopping = threading.Event()
+        self._workers: list[threading.Thread] = []
+        self._generated = 0
+        self._reused = 0
+        self._errors: list[ScanErrorItem] = []
+
+    def _priority(self, clip: VideoClip) -> tuple[int, float]:
+        # Najpierw ostatnio oglądane, potem ostatnio nagrane.
+        viewed = self._cache.last_viewed(clip.path)
+        if viewed is not None:
+            return 0, -viewed
+        return 1, -clip.start_time.timestamp()
+
+    def enqueue(self, clips: Iterable[VideoClip]) -> None:
+        with self._lock:
+            for clip in clips:
+                if clip.provisional or clip.path in self._queued:
+                    continue
+                self._queued.add(clip.path)
+                self._sequence += 1
+                tier, order = self._priority(clip)
+                heapq.heappush(self._queue, (tier, order, self._sequence, clip))
+
+    def prioritize(self, clip: VideoClip) -> None:
+        self._cache.mark_viewed(clip.path)
+        with self._lock:
+            self._sequence += 1
+            self._queued.add(clip.path)
+            heapq.heappush(self._queue, (-1, 0.0, self._sequence, clip))
+
+    def start(self) -> None:
+        if shutil.which(self._ffmpeg_executable) is None:
+            raise RuntimeError("ffmpeg nie jest dostępny")
+        for number in range(max(1, self._settings.max_workers)):
+            worker = threading.Thread(target=self._work, name=f"mtv-proxy-{number}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def wait(self) -> None:
+        for worker in self._workers:
+            worker.join()
+        self._workers.clear()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self.wait()
+
+    def report(self) -> ProxyReport:
+        with self._lock:
+            return ProxyReport(generated=self._generated, reused=self._reused, errors=tuple(self._errors))
+
+    def _next(self) -> Optional[VideoClip]:
+        with self._lock:
+            while self._queue:
+                _, _, _, clip = heapq.heappop(self._queue)
+                if clip.path in self._queued:
+                    self._queued.discard(clip.path)
+                    return clip
+            return None
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            clip = self._next()
+            if clip is None:
+                return
+            if self._cache.lookup(clip.path) is not None:
+                with self._lock:
+                    self._reused += 1
+                continue
+            try:
+                proxy_path = self.generate(clip)
+            except subprocess.CalledProcessError as exc:
+                stderr = exc.stderr.decode("utf-8", errors="replace").strip() if exc.stderr else None
+                with self._lock:
+                    self._errors.append(
+                        ScanErrorItem(path=clip.path, message="Nie udało się utworzyć proxy", context=stderr)
+                    )
+                continue
+            except OSError as exc:
+                # os.replace, stat() lub zapis indeksu proxy - błąd jednego klipu, wątek działa dalej.
+                with self._lock:
+                    self._errors.append(
+                        ScanErrorItem(path=clip.path, message="Nie udało się zapisać proxy", context=str(exc))
+                    )
+                continue
+            with self._lock:
+                self._generated += 1
+            if self._on_generated is not None:
+                self._on_generated(clip, proxy_path)
+
+    def generate(self, clip: VideoClip) -> Path:
+        proxy_path = self._cache.proxy_path_for(clip.path)
+        temporary_path = proxy_path.with_name(proxy_path.stem + ".part.mp4")
+        settings = self._settings
+        try:
+            subprocess.run(
+                low_priority_command(
+                    [
+                        self._ffmpeg_executable,
+                        "-y",
+                        "-v",
+                        "error",
+                        "-threads",
+                        str(settings.ffmpeg_threads),
+                        "-i",
+                        str(clip.path),
+                        "-an",
+                        "-map",
+                        "0:v:0",
+                        "-vf",
+                        f"scale=-2:{settings.height}",
+                        "-c:v",
+                        "libx264",
+                        "-preset",
+                        "veryfast",
+                        "-tune",
+                        "fastdecode",
+                        "-crf",
+                        str(settings.crf),
+                        "-g",
+                        str(settings.gop_frames),
+                        "-keyint_min",
+                        str(settings.gop_frames),
+                        "-sc_threshold",
+                        "0",
+                        "-bf",
+                        "0",
+                        "-pix_fmt",
+                        "yuv420p",
+                        "-movflags",
+                        "+faststart",
+                        "-threads",
+                        str(settings.ffmpeg_threads),
+                        str(temporary_path),
+                    ]
+                ),
+                check=True,
+                capture_output=True,
+                **low_priority_subprocess_kwargs(),
+            )
+            os.replace(temporary_path, proxy_path)
+        finally:
+            temporary_path.unlink(missing_ok=True)
+        self._cache.add(clip, proxy_path)
+        return proxy_path
@@ -4,7 +4,7 @@ import sqlite3
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Protocol
 
 from app.domain.models import VideoClip
 
@@ -17,11 +17,36 @@ class CachedClip:
     duration_seconds: float
 
 
+class ClipCache(Protocol):
+    @property
+    def location(self) -> Path:
+        ...
+
+    def load(self, path: Path, timezone_name: str) -> Optional[CachedClip]:
+        ...
+
+    def save(self, clip: VideoClip, timezone_name: str) -> None:
+        ...
+
+    def load_coverage(self, camera_label: str) -> Optional[bytes]:
+        ...
+
+    def save_coverage(self, camera_label: str, payload: bytes) -> None:
+        ...
+
+    def flush(self) -> None:
+        ...
+
+
 class ScanCache:
     def __init__(self, database_path: Path) -> None:
         self._database_path = database_path
         self._ensure_schema()
 
+    @property
+    def location(self) -> Path:
+        return self._database_path
+
     def _ensure_schema(self) -> None:
         with sqlite3.connect(self._database_path) as connection:
             connection.execute(
@@ -37,6 +62,19 @@ class ScanCache:
                 )
                 """
             )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS coverage_pyramid (
+                    camera_label TEXT PRIMARY KEY,
+                    payload BLOB NOT NULL
+                )
+                """
+            )
+            # Plik cache na nośniku tylko do odczytu otwiera się bez błędu, a CREATE IF NOT EXISTS
+            # niczego nie zapisuje - próbny zapis (wycofany) ujawnia to od razu, a nie przy pierwszym save().
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("DELETE FROM coverage_pyramid WHERE camera_label IS NULL")
+            connection.rollback()
 
     def load(self, path: Path, timezone_name: str) -> Optional[CachedClip]:
         stat = path.stat()
@@ -83,3 +121,21 @@ class ScanCache:
     def save_many(self, clips: Iterable[VideoClip], timezone_name: str) -> None:
         for clip in clips:
             self.save(clip, timezone_name)
+
+    def load_coverage(self, camera_label: str) -> Optional[bytes]:
+        with sqlite3.connect(self._database_path) as connection:
+            row = connection.execute(
+                "SELECT payload FROM coverage_pyramid WHERE camera_label = ?",
+                (camera_label,),
+            ).fetchone()
+        return None if row is None else bytes(row[0])
+
+    def save_coverage(self, camera_label: str, payload: bytes) -> None:
+        with sqlite3.connect(self._database_path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO coverage_pyramid (camera_label, payload) VALUES (?, ?)",
+                (camera_label, sqlite3.Binary(payload)),
+            )
+
+    def flush(self) -> None:
+        return None
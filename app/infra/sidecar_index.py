@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import sys
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from app.domain.models import VideoClip
+from app.infra.scan_cache import CachedClip
+
+SIDECAR_FORMAT = "mtv-sidecar-index"
+SIDECAR_VERSION = 2
+_READABLE_VERSIONS = (1, SIDECAR_VERSION)
+SIDECAR_SUFFIX = ".mtvidx"
+BUNDLED_INDEX_NAME = ".mtv_index" + SIDECAR_SUFFIX
+
+
+@dataclass(frozen=True)
+class SidecarEntry:
+    relative_path: str
+    size: int
+    mtime: float
+    camera_label: str
+    start_time: datetime
+    duration_seconds: float
+    timezone_name: str
+    # False dla wpisów z importu/indeksu na nośniku: mtime pochodzi z innej maszyny.
+    mtime_verified: bool = True
+
+
+def _windows_volume_serial(path: Path) -> str:
+    try:
+        import ctypes
+
+        drive = os.path.splitdrive(str(path))[0]
+        serial = ctypes.c_uint32()
+        ok = ctypes.windll.kernel32.GetVolumeInformationW(
+            ctypes.c_wchar_p(drive + "\\"), None, 0, ctypes.byref(serial), None, None, None, 0
+        )
+    except (AttributeError, OSError, ValueError):
+        return ""
+    return f"{serial.value:08x}" if ok else ""
+
+
+def _posix_volume_uuid(path: Path) -> str:
+    try:
+        mounts = Path("/proc/self/mounts").read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return ""
+    resolved = str(path)
+    device, mount_point = "", ""
+    for line in mounts:
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        candidate = fields[1].replace("\\040", " ")
+        inside = resolved == candidate or resolved.startswith(candidate.rstrip("/") + "/")
+        if inside and len(candidate) >= len(mount_point):
+            device, mount_point = fields[0], candidate
+    if not device.startswith("/dev/"):
+        return ""
+    try:
+        real_device = os.path.realpath(device)
+        for link in Path("/dev/disk/by-uuid").iterdir():
+            if os.path.realpath(link) == real_device:
+                return link.name
+    except OSError:
+        return ""
+    return ""
+
+
+def volume_identity(path: Path) -> str:
+    # Numer seryjny / UUID woluminu: różne płyty montowane w E:/ lub /media/cdrom mają różne indeksy.
+    resolved = path.resolve()
+    return _windows_volume_serial(resolved) if sys.platform == "win32" else _posix_volume_uuid(resolved)
+
+
+def root_identity(root: Path) -> str:
+    resolved = str(root.resolve()).replace("\\", "/").rstrip("/").casefold()
+    volume = volume_identity(root)
+    key = f"{resolved}|{volume}" if volume else resolved
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+def default_cache_dir() -> Path:
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA")
+        if base:
+            return Path(base) / "MTV" / "cache"
+    base = os.environ.get("XDG_CACHE_HOME")
+    if base:
+        return Path(base) / "mtv"
+    return Path.home() / ".cache" / "mtv"
+
+
+def sidecar_path_for(root: Path, cache_dir: Path) -> Path:
+    return cache_dir / f"{root.resolve().name or 'root'}-{root_identity(root)}{SIDECAR_SUFFIX}"
+
+
+def sidecar_entry_for(root: Path, clip: VideoClip, timezone_name: str) -> SidecarEntry:
+    stat = clip.path.stat()
+    return SidecarEntry(
+        relative_path=clip.path.relative_to(root).as_posix(),
+        size=stat.st_size,
+        mtime=stat.st_mtime,
+        camera_label=clip.camera_label,
+        start_time=clip.start_time,
+        duration_seconds=clip.duration.total_seconds(),
+        timezone_name=timezone_name,
+    )
+
+
+def read_sidecar(path: Path) -> dict[str, SidecarEntry]:
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        payload = json.load(handle)
+    if payload.get("format") != SIDECAR_FORMAT:
+        raise ValueError(f"Nieznany format indeksu: {path}")
+    if payload.get("version") not in _READABLE_VERSIONS:
+        raise ValueError(f"Nieobsługiwana wersja indeksu {payload.get('version')}: {path}")
+
+    cameras: list[str] = payload["cameras"]
+    timezones: list[str] = payload["timezones"]
+    entries: dict[str, SidecarEntry] = {}
+    for row in payload["entries"]:
+        relative_path, size, mtime, camera_index, start_epoch, duration, timezone_index = row[:7]
+        timezone_name = timezones[timezone_index]
+        entries[relative_path] = SidecarEntry(
+            relative_path=relative_path,
+            size=size,
+            mtime=mtime,
+            camera_label=cameras[camera_index],
+            start_time=datetime.fromtimestamp(start_epoch, ZoneInfo(timezone_name)),
+            duration_seconds=duration,
+            timezone_name=timezone_name,
+            mtime_verified=bool(row[7]) if len(row) > 7 else False,
+        )
+    return entries
+
+
+def write_sidecar(path: Path, root: Path, entries: Iterable[SidecarEntry]) -> None:
+    cameras: dict[str, int] = {}
+    timezones: dict[str, int] = {}
+    rows = []
+    for entry in sorted(entries, key=lambda item: item.relative_path):
+        camera_index = cameras.setdefault(entry.camera_label, len(cameras))
+        timezone_index = timezones.setdefault(entry.timezone_name, len(timezones))
+        rows.append(
+            [
+                entry.relative_path,
+                entry.size,
+                entry.mtime,
+                camera_index,
+                entry.start_time.timestamp(),
+                entry.duration_seconds,
+                timezone_index,
+                int(entry.mtime_verified),
+            ]
+        )
+    payload = {
+        "format": SIDECAR_FORMAT,
+        "version": SIDECAR_VERSION,
+        "root_name": root.resolve().name,
+        "root_id": root_identity(root),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "cameras": list(cameras),
+        "timezones": list(timezones),
+        "entries": rows,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary_path = path.with_name(path.name + ".tmp")
+    with gzip.open(temporary_path, "wt", encoding="utf-8") as handle:
+        json.dump(payload, handle, ensure_ascii=False, separators=(",", ":"))
+    temporary_path.replace(path)
+
+
+class SidecarIndex:
+    def __init__(self, index_path: Path, root: Path) -> None:
+        self._index_path = index_path
+        self._root = root
+        self._entries: dict[str, SidecarEntry] = {}
+        self._dirty = False
+        if index_path.exists():
+            try:
+                self._entries = read_sidecar(index_path)
+            except (OSError, ValueError, KeyError, TypeError, json.JSONDecodeError):
+                self._entries = {}
+        bundled_path = root / BUNDLED_INDEX_NAME
+        if not self._entries and bundled_path.exists():
+            try:
+                self.merge_from(bundled_path)
+            except (OSError, ValueError, KeyError, TypeError, json.JSONDecodeError):
+                pass
+
+    @property
+    def index_path(self) -> Path:
+        return self._index_path
+
+    @property
+    def location(self) -> Path:
+        return self._index_path
+
+    def _relative_key(self, path: Path) -> str:
+        return path.relative_to(self._root).as_posix()
+
+    def load(self, path: Path, timezone_name: str) -> Optional[CachedClip]:
+        entry = self._entries.get(self._relative_key(path))
+        if entry is None or entry.timezone_name != timezone_name:
+            return None
+        stat = path.stat()
+        if stat.st_size != entry.size:
+            return None
+        if entry.mtime_verified and stat.st_mtime != entry.mtime:
+            return None
+        if not entry.mtime_verified:
+            # Pierwsze trafienie wpisu z importu: zapamiętujemy lokalny mtime, kolejne zmiany będą wykryte.
+            self._entries[entry.relative_path] = replace(entry, mtime=stat.st_mtime, mtime_verified=True)
+            self._dirty = True
+        return CachedClip(
+            path=path,
+            camera_label=entry.camera_label,
+            start_time=entry.start_time,
+            duration_seconds=entry.duration_seconds,
+        )
+
+    def save(self, clip: VideoClip, timezone_name: str) -> None:
+        entry = sidecar_entry_for(self._root, clip, timezone_name)
+        self._entries[entry.relative_path] = entry
+        self._dirty = True
+
+    def save_many(self, clips: Iterable[VideoClip], timezone_name: str) -> None:
+        for clip in clips:
+            self.save(clip, timezone_name)
+
+    def merge_from(self, source_path: Path) -> int:
+        imported = read_sidecar(source_path)
+        self._entries.update(
+            (key, replace(entry, mtime_verified=False)) for key, entry in imported.items()
+        )
+        self._dirty = True
+        return len(imported)
+
+    def _coverage_path(self, camera_label: str) -> Path:
+        digest = hashlib.sha256(camera_label.encode("utf-8")).hexdigest()[:16]
+        return self._index_path.with_name(self._index_path.name + ".coverage") / f"{digest}.npz"
+
+    def load_coverage(self, camera_label: str) -> Optional[bytes]:
+        path = self._coverage_path(camera_label)
+        return path.read_bytes() if path.exists() else None
+
+    def save_coverage(self, camera_label: str, payload: bytes) -> None:
+        path = self._coverage_path(camera_label)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(payload)
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        write_sidecar(self._index_path, self._root, self._entries.values())
+        self._dirty = False
@@ -1,29 +1,150 @@
 from __future__ import annotations
 
 import argparse
+import sqlite3
+import subprocess
 from datetime import datetime
 from pathlib import Path
-
-from app.app.use_cases import HashFilesUseCase, HashRequest, ScanClipsUseCase, ScanRequest
-from app.domain.models import VideoClip
+from typing import Sequence
+
+from app.app.use_cases import (
+    HashFilesUseCase,
+    HashRequest,
+    MultiRootScanRequest,
+    ScanClipsUseCase,
+    ScanRequest,
+    ScanRootsUseCase,
+)
+from app.domain.models import CameraClipIndex, ScanReport, VideoClip
+from app.infra.activity_index import ActivityIndex, activity_dir_for
 from app.infra.audit_log import AuditEntry, AuditLogger
-from app.infra.clip_exporter import ClipExporter, create_evidence_package
+from app.infra.clip_exporter import (
+    ClipExporter,
+    create_evidence_archive,
+    create_evidence_package,
+    iter_file_chunks,
+    streaming_suffix,
+)
 from app.infra.clip_scanner import FileSystemClipScanner
+from app.infra.coverage_pyramid import load_coverage_pyramid
+from app.infra.duration_resolver import LazyDurationResolver
+from app.infra.federated_scanner import DEFAULT_IDLE_TIMEOUT_SECONDS, FederatedClipScanner, unique_roots
+from app.infra.frame_snapshot import take_snapshots
 from app.infra.hash_calculator import Sha256HashCalculator
-from app.infra.scan_cache import ScanCache
+from app.infra.proxy_cache import ProxyCache
+from app.infra.proxy_generator import ProxyGenerator, ProxySettings
+from app.infra.scan_cache import ClipCache, ScanCache
+from app.infra.sidecar_index import (
+    BUNDLED_INDEX_NAME,
+    SidecarIndex,
+    default_cache_dir,
+    sidecar_entry_for,
+    sidecar_path_for,
+    write_sidecar,
+)
 from app.infra.time_utils import to_timezone
 
 
-def build_scanner(root: Path) -> FileSystemClipScanner:
-    cache_path = root / ".mtv_cache.sqlite"
-    cache = ScanCache(cache_path)
-    return FileSystemClipScanner(cache=cache)
+def build_cache(root: Path, cache_dir: Path | None = None) -> ClipCache:
+    if cache_dir is not None:
+        return SidecarIndex(sidecar_path_for(root, cache_dir), root)
+    if (root / BUNDLED_INDEX_NAME).exists():
+        return SidecarIndex(sidecar_path_for(root, default_cache_dir()), root)
+    try:
+        return ScanCache(root / ".mtv_cache.sqlite")
+    except (sqlite3.Error, OSError):
+        # Nośnik tylko do odczytu (DVD, zabezpieczony USB) - indeks poza katalogiem.
+        return SidecarIndex(sidecar_path_for(root, default_cache_dir()), root)
+
+
+def build_scanner(root: Path, cache_dir: Path | None = None) -> FileSystemClipScanner:
+    return FileSystemClipScanner(cache=build_cache(root, cache_dir))
 
 
-def run_scan(root: Path, timezone_name: str) -> tuple[list[VideoClip], str]:
-    scanner = build_scanner(root)
-    use_case = ScanClipsUseCase(scanner)
-    report = use_case.execute(ScanRequest(root=root, timezone_name=timezone_name))
+def build_resolver(root: Path, timezone_name: str, cache_dir: Path | None = None) -> LazyDurationResolver:
+    cache = build_cache(root, cache_dir)
+    report = FileSystemClipScanner(cache=cache).scan_provisional(root, timezone_name)
+    clips = [clip for index in report.camera_indexes for clip in index.clips]
+    return LazyDurationResolver(clips, timezone_name, cache=cache)
+
+
+def scan_roots(
+    roots: Sequence[Path],
+    timezone_name: str,
+    cache_dir: Path | None = None,
+    root_timeout: float | None = None,
+) -> ScanReport:
+    if len(roots) == 1:
+        scanner = build_scanner(roots[0], cache_dir)
+        return ScanClipsUseCase(scanner).execute(ScanRequest(root=roots[0], timezone_name=timezone_name))
+    # Każdy katalog ma własny cache; wolny lub niedostępny katalog nie blokuje pozostałych.
+    federated = FederatedClipScanner(lambda root: build_scanner(root, cache_dir), timeout_seconds=root_timeout)
+    return ScanRootsUseCase(federated).execute(
+        MultiRootScanRequest(roots=tuple(roots), timezone_name=timezone_name)
+    )
+
+
+def load_camera_indexes(
+    roots: Sequence[Path],
+    timezone_name: str,
+    cache_dir: Path | None = None,
+    lazy: bool = False,
+    root_timeout: float | None = None,
+) -> tuple[tuple[CameraClipIndex, ...], LazyDurationResolver | None]:
+    if lazy:
+        resolver = build_resolver(single_root(roots, "--lazy"), timezone_name, cache_dir)
+        return resolver.camera_indexes(), resolver
+    report = scan_roots(roots, timezone_name, cache_dir, root_timeout)
+    print_skipped_roots(report, roots)
+    return report.camera_indexes, None
+
+
+def print_skipped_roots(report: ScanReport, roots: Sequence[Path]) -> None:
+    for error in report.errors:
+        if error.path in roots:
+            print(f"Pominięto katalog {error.path}: {error.message}")
+
+
+def single_root(roots: Sequence[Path], option: str) -> Path:
+    if len(roots) != 1:
+        raise SystemExit(f"{option} obsługuje tylko jeden --root")
+    return roots[0]
+
+
+def matches_camera(index: CameraClipIndex, camera: str) -> bool:
+    return camera in (index.camera_label, index.qualified_label)
+
+
+def find_clip(
+    index: CameraClipIndex,
+    moment: datetime,
+    resolver: LazyDurationResolver | None = None,
+) -> VideoClip | None:
+    clip = index.clip_for_time(moment)
+    if clip is None or resolver is None:
+        return clip
+    clip = resolver.resolve(clip)
+    return clip if clip.contains(moment) else None
+
+
+def run_lazy_scan(root: Path, timezone_name: str, cache_dir: Path | None = None) -> None:
+    resolver = build_resolver(root, timezone_name, cache_dir)
+    indexes = resolver.camera_indexes()
+    print(f"Wstępny indeks: kamery: {len(indexes)}, klipy do sprawdzenia: {resolver.pending}")
+    resolver.start()
+    resolver.wait()
+    resolver.stop()
+    print(f"Uzupełniono długości, błędy: {len(resolver.errors)}")
+
+
+def run_scan(
+    roots: Sequence[Path],
+    timezone_name: str,
+    cache_dir: Path | None = None,
+    root_timeout: float | None = None,
+) -> tuple[list[VideoClip], str]:
+    report = scan_roots(roots, timezone_name, cache_dir, root_timeout)
+    print_skipped_roots(report, roots)
     clips: list[VideoClip] = []
     for index in report.camera_indexes:
         clips.extend(index.clips)
@@ -37,53 +158,185 @@ def run_scan(root: Path, timezone_name: str) -> tuple[list[VideoClip], str]:
     return clips, summary
 
 
-def list_cameras(root: Path, timezone_name: str) -> None:
-    scanner = build_scanner(root)
-    report = ScanClipsUseCase(scanner).execute(ScanRequest(root=root, timezone_name=timezone_name))
-    for index in report.camera_indexes:
-        print(index.camera_label)
+def list_cameras(
+    roots: Sequence[Path],
+    timezone_name: str,
+    cache_dir: Path | None = None,
+    root_timeout: float | None = None,
+) -> None:
+    camera_indexes, _ = load_camera_indexes(roots, timezone_name, cache_dir, root_timeout=root_timeout)
+    for index in camera_indexes:
+        print(index.qualified_label)
 
 
-def list_clips(root: Path, timezone_name: str, camera: str) -> None:
-    scanner = build_scanner(root)
-    report = ScanClipsUseCase(scanner).execute(ScanRequest(root=root, timezone_name=timezone_name))
-    for index in report.camera_indexes:
-        if index.camera_label == camera:
-            for clip in index.clips:
-                print(f"{clip.start_time.isoformat()} -> {clip.end_time.isoformat()} | {clip.path}")
-            return
-    print(f"Brak kamery: {camera}")
+def list_clips(
+    roots: Sequence[Path],
+    timezone_name: str,
+    camera: str,
+    cache_dir: Path | None = None,
+    root_timeout: float | None = None,
+) -> None:
+    camera_indexes, _ = load_camera_indexes(roots, timezone_name, cache_dir, root_timeout=root_timeout)
+    matching = [index for index in camera_indexes if matches_camera(index, camera)]
+    for index in matching:
+        if len(matching) > 1:
+            print(f"[{index.qualified_label}]")
+        for clip in index.clips:
+            print(f"{clip.start_time.isoformat()} -> {clip.end_time.isoformat()} | {clip.path}")
+    if not matching:
+        print(f"Brak kamery: {camera}")
+
+
+def clip_at(
+    roots: Sequence[Path],
+    timezone_name: str,
+    timestamp: str,
+    cache_dir: Path | None = None,
+    lazy: bool = False,
+    root_timeout: float | None = None,
+) -> None:
+    camera_indexes, resolver = load_camera_indexes(roots, timezone_name, cache_dir, lazy, root_timeout)
+    moment = to_timezone(datetime.fromisoformat(timestamp), timezone_name)
+    for index in camera_indexes:
+        clip = find_clip(index, moment, resolver)
+        if clip:
+            print(f"{index.qualified_label}: {clip.path}")
+    if resolver is not None:
+        resolver.stop()
 
 
-def clip_at(root: Path, timezone_name: str, timestamp: str) -> None:
-    scanner = build_scanner(root)
-    report = ScanClipsUseCase(scanner).execute(ScanRequest(root=root, timezone_name=timezone_name))
+def coverage(
+    roots: Sequence[Path],
+    timezone_name: str,
+    start: str,
+    end: str,
+    columns: int,
+    cache_dir: Path | None = None,
+) -> None:
+    root = single_root(roots, "coverage")
+    cache = build_cache(root, cache_dir)
+    report = ScanClipsUseCase(FileSystemClipScanner(cache=cache)).execute(
+        ScanRequest(root=root, timezone_name=timezone_name)
+    )
+    start_time = to_timezone(datetime.fromisoformat(start), timezone_name)
+    end_time = to_timezone(datetime.fromisoformat(end), timezone_name)
+    shades = " ░▒▓█"
+    try:
+        for index in report.camera_indexes:
+            fractions = load_coverage_pyramid(index, cache).coverage(start_time, end_time, columns)
+            bar = "".join(shades[round(float(value) * (len(shades) - 1))] for value in fractions)
+            print(f"{index.camera_label:>12} |{bar}|")
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
+
+
+def analyze_activity(
+    roots: Sequence[Path],
+    timezone_name: str,
+    camera: str | None,
+    workers: int | None,
+    cache_dir: Path | None = None,
+) -> None:
+    root = single_root(roots, "analyze-activity")
+    cache = build_cache(root, cache_dir)
+    report = ScanClipsUseCase(FileSystemClipScanner(cache=cache)).execute(
+        ScanRequest(root=root, timezone_name=timezone_name)
+    )
+    try:
+        activity_index = ActivityIndex(activity_dir_for(cache.location))
+        selected = [index for index in report.camera_indexes if camera is None or index.camera_label == camera]
+        activity_reports = activity_index.analyze_many(
+            selected,
+            max_workers=workers,
+            progress_callback=lambda done, total: print(f"  {done}/{total}", end="\r"),
+        )
+        for activity_report in activity_reports:
+            print(
+                f"{activity_report.camera_label}: nowe klipy: {activity_report.analyzed_clips}, "
+                f"próbki: {activity_report.samples}, błędy: {len(activity_report.errors)}"
+            )
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
+
+
+def next_activity(
+    roots: Sequence[Path],
+    timezone_name: str,
+    camera: str,
+    after: str,
+    threshold: float,
+    cache_dir: Path | None = None,
+) -> None:
+    root = single_root(roots, "next-activity")
+    cache = build_cache(root, cache_dir)
+    moment = to_timezone(datetime.fromisoformat(after), timezone_name)
+    try:
+        found = ActivityIndex(activity_dir_for(cache.location)).next_activity_after(camera, moment, threshold)
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
+    if found is None:
+        print(f"Brak aktywności po {moment.isoformat()}")
+        return
+    print(f"{camera}: {found.isoformat()}")
+
+
+def snapshot(
+    roots: Sequence[Path],
+    timezone_name: str,
+    timestamp: str,
+    output_dir: Path,
+    cache_dir: Path | None = None,
+    lazy: bool = False,
+    root_timeout: float | None = None,
+) -> None:
+    camera_indexes, resolver = load_camera_indexes(roots, timezone_name, cache_dir, lazy, root_timeout)
     moment = to_timezone(datetime.fromisoformat(timestamp), timezone_name)
-    for index in report.camera_indexes:
-        clip = index.clip_for_time(moment)
-        if clip:
-            print(f"{index.camera_label}: {clip.path}")
+    try:
+        snapshot_report = take_snapshots(
+            camera_indexes,
+            moment,
+            output_dir,
+            clip_resolver=lambda index, at: find_clip(index, at, resolver),
+        )
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
+    finally:
+        if resolver is not None:
+            resolver.stop()
+
+    for item, entry in zip(snapshot_report.snapshots, snapshot_report.hash_report.entries):
+        print(f"{item.camera_label}: {item.image_path} | {entry.sha256}")
+    for error in snapshot_report.errors:
+        print(f"Błąd: {error.path}: {error.message}")
+    print(f"Zrzuty zapisano w {output_dir}")
 
 
 def export_evidence(
-    root: Path,
+    roots: Sequence[Path],
     timezone_name: str,
     camera: str,
     start: str,
     end: str,
     output_dir: Path,
+    cache_dir: Path | None = None,
+    lazy: bool = False,
+    archive: bool = False,
+    root_timeout: float | None = None,
 ) -> None:
-    scanner = build_scanner(root)
-    report = ScanClipsUseCase(scanner).execute(ScanRequest(root=root, timezone_name=timezone_name))
+    camera_indexes, resolver = load_camera_indexes(roots, timezone_name, cache_dir, lazy, root_timeout)
     start_time = to_timezone(datetime.fromisoformat(start), timezone_name)
     end_time = to_timezone(datetime.fromisoformat(end), timezone_name)
 
+    matching = [index for index in camera_indexes if matches_camera(index, camera)]
+    if len(matching) > 1:
+        options = ", ".join(index.qualified_label for index in matching)
+        raise SystemExit(f"Kamera {camera} występuje w kilku katalogach, wybierz jedną z: {options}")
+
     selected: VideoClip | None = None
-    for index in report.camera_indexes:
-        if index.camera_label != camera:
-            continue
-        selected = index.clip_for_time(start_time)
-        break
+    for index in matching:
+        selected = find_clip(index, start_time, resolver)
+    if resolver is not None:
+        resolver.stop()
 
     if selected is None:
         raise SystemExit("Nie znaleziono klipu w podanym zakresie.")
@@ -94,7 +347,49 @@ def export_evidence(
     offset_seconds = (start_time - selected.start_time).total_seconds()
     duration_seconds = (end_time - start_time).total_seconds()
 
+    metadata = {
+        "camera": camera,
+        "start": start_time.isoformat(),
+        "end": end_time.isoformat(),
+        "offset_seconds": offset_seconds,
+        "duration_seconds": duration_seconds,
+        "source": str(selected.path),
+    }
+    if selected.source_root is not None:
+        metadata["root"] = str(selected.source_root)
+
     exporter = ClipExporter()
+    if archive:
+        try:
+            clip_name = f"{selected.path.stem}{streaming_suffix(selected.path.suffix)}"
+            clip_chunks = exporter.stream_segment(
+                selected.path, offset_seconds, duration_seconds, selected.path.suffix
+            )
+            export_note = "Wyeksportowano fragment przez ffmpeg"
+        except RuntimeError:
+            clip_name = selected.path.name
+            clip_chunks = iter_file_chunks(selected.path)
+            export_note = "ffmpeg niedostępny, zapisano cały plik"
+        metadata["exported"] = clip_name
+        try:
+            evidence_archive = create_evidence_archive(
+                archive_path=output_dir / f"{selected.path.stem}_evidence.zip",
+                clip_name=clip_name,
+                clip_chunks=clip_chunks,
+                metadata=metadata,
+                audit_entries=[AuditEntry(event="evidence_export", message=export_note)],
+            )
+        except subprocess.CalledProcessError as exc:
+            stderr = exc.stderr.decode("utf-8", errors="replace").strip() if exc.stderr else ""
+            details = "\n".join(stderr.splitlines()[-10:])
+            message = f"Eksport nie powiódł się (ffmpeg zakończył się kodem {exc.returncode})"
+            raise SystemExit(f"{message}: {details}" if details else message) from exc
+        except OSError as exc:
+            raise SystemExit(f"Eksport nie powiódł się: {exc}") from exc
+        print(f"Archiwum zapisano w {evidence_archive.archive_path}")
+        print(f"SHA-256 archiwum: {evidence_archive.archive_sha256}")
+        return
+
     try:
         exporter.export_segment(selected.path, exported_clip_path, offset_seconds, duration_seconds)
         export_note = "Wyeksportowano fragment przez ffmpeg"
@@ -106,15 +401,7 @@ def export_evidence(
         HashRequest(paths=(exported_clip_path,))
     )
 
-    metadata = {
-        "camera": camera,
-        "start": start_time.isoformat(),
-        "end": end_time.isoformat(),
-        "offset_seconds": offset_seconds,
-        "duration_seconds": duration_seconds,
-        "source": str(selected.path),
-        "exported": str(exported_clip_path),
-    }
+    metadata["exported"] = str(exported_clip_path)
 
     audit_entries = [
         AuditEntry(event="evidence_export", message=export_note),
@@ -135,10 +422,139 @@ def export_evidence(
     print(f"Pakiet zapisano w {output_dir}")
 
 
+def build_proxy_cache(proxy_dir: Path | None, max_size_gb: float) -> ProxyCache:
+    return ProxyCache(proxy_dir or default_cache_dir() / "proxies", int(max_size_gb * 1024**3))
+
+
+def generate_proxies(
+    roots: Sequence[Path],
+    timezone_name: str,
+    proxy_dir: Path | None,
+    max_size_gb: float,
+    limit: int | None,
+    workers: int,
+    threads: int,
+    cache_dir: Path | None = None,
+    root_timeout: float | None = None,
+) -> None:
+    camera_indexes, _ = load_camera_indexes(roots, timezone_name, cache_dir, root_timeout=root_timeout)
+    proxy_cache = build_proxy_cache(proxy_dir, max_size_gb)
+    generator = ProxyGenerator(
+        proxy_cache,
+        ProxySettings(ffmpeg_threads=threads, max_workers=workers),
+        on_generated=lambda clip, path: print(f"{clip.camera_label}: {clip.path.name} -> {path.name}"),
+    )
+    clips = sorted(
+        (clip for index in camera_indexes for clip in index.clips),
+        key=lambda clip: (proxy_cache.last_viewed(clip.path) is None, -clip.start_time.timestamp()),
+    )
+    generator.enqueue(clips[:limit] if limit else clips)
+    try:
+        generator.start()
+        generator.wait()
+    except RuntimeError as exc:
+        raise SystemExit(str(exc)) from exc
+    except KeyboardInterrupt:
+        generator.stop()
+    report = generator.report()
+    print(
+        f"Proxy: utworzone: {report.generated}, istniejące: {report.reused}, błędy: {len(report.errors)}, "
+        f"rozmiar cache: {proxy_cache.total_bytes / 1024**2:.1f} MB"
+    )
+
+
+def playback(
+    roots: Sequence[Path],
+    timezone_name: str,
+    camera: str,
+    timestamp: str,
+    proxy_dir: Path | None,
+    max_size_gb: float,
+    cache_dir: Path | None = None,
+    lazy: bool = False,
+    root_timeout: float | None = None,
+) -> None:
+    camera_indexes, resolver = load_camera_indexes(roots, timezone_name, cache_dir, lazy, root_timeout)
+    moment = to_timezone(datetime.fromisoformat(timestamp), timezone_name)
+    matching = [index for index in camera_indexes if matches_camera(index, camera)]
+    if len(matching) > 1:
+        options = ", ".join(index.qualified_label for index in matching)
+        raise SystemExit(f"Kamera {camera} występuje w kilku katalogach, wybierz jedną z: {options}")
+    selected = find_clip(matching[0], moment, resolver) if matching else None
+    if resolver is not None:
+        resolver.stop()
+    if selected is None:
+        raise SystemExit("Nie znaleziono klipu dla podanego czasu.")
+
+    proxy_cache = build_proxy_cache(proxy_dir, max_size_gb)
+    proxy_cache.mark_viewed(selected.path)
+    source = proxy_cache.playback_source(selected)
+    playback_offset = (moment - selected.start_time).total_seconds()
+    kind = "proxy" if source.is_proxy else "oryginał"
+    print(f"Odtwarzanie ({kind}): {source.path} @ {playback_offset:.3f}s")
+    print(f"Eksport dowodowy: {selected.path} @ {source.to_source_offset(playback_offset):.3f}s")
+
+
+def export_index(
+    roots: Sequence[Path],
+    timezone_name: str,
+    output_path: Path,
+    cache_dir: Path | None = None,
+) -> None:
+    root = single_root(roots, "export-index")
+    scanner = build_scanner(root, cache_dir)
+    report = ScanClipsUseCase(scanner).execute(ScanRequest(root=root, timezone_name=timezone_name))
+    entries = [
+        sidecar_entry_for(root, clip, timezone_name)
+        for index in report.camera_indexes
+        for clip in index.clips
+    ]
+    write_sidecar(output_path, root, entries)
+    print(f"Indeks ({len(entries)} klipów) zapisano w {output_path}")
+
+
+def import_index(roots: Sequence[Path], input_path: Path, cache_dir: Path | None = None) -> None:
+    root = single_root(roots, "import-index")
+    index = SidecarIndex(sidecar_path_for(root, cache_dir or default_cache_dir()), root)
+    try:
+        imported = index.merge_from(input_path)
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        raise SystemExit(f"Nie udało się wczytać indeksu: {exc}") from exc
+    index.flush()
+    print(f"Zaimportowano {imported} wpisów do {index.index_path}")
+    print(f"Użyj: --cache-dir \"{index.index_path.parent}\"")
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="MTV - Modular Timeline Viewer CLI")
-    parser.add_argument("--root", type=Path, required=True, help="Katalog z nagraniami")
+    parser.add_argument(
+        "--root",
+        type=Path,
+        action="append",
+        required=True,
+        help="Katalog z nagraniami (można podać wiele razy, np. dla kilku obiektów)",
+    )
+    parser.add_argument(
+        "--root-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT_SECONDS,
+        help=(
+            "Przy wielu katalogach pomiń katalog, który przez tyle sekund nie robi postępu "
+            f"(domyślnie {DEFAULT_IDLE_TIMEOUT_SECONDS:g})"
+        ),
+    )
     parser.add_argument("--timezone", default="Europe/Warsaw", help="Strefa czasowa")
+    parser.add_argument(
+        "--lazy",
+        action="store_true",
+        help="Najpierw nazwy plików, długości klipów od najnowszych / na żądanie",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Katalog indeksu poza --root (np. dla nośników tylko do odczytu)",
+    )
 
     subparsers = parser.add_subparsers(dest="command", required=True)
 
@@ -152,30 +568,134 @@ def build_parser() -> argparse.ArgumentParser:
     clip_at_parser = subparsers.add_parser("clip-at", help="Znajdź klip dla czasu")
     clip_at_parser.add_argument("--timestamp", required=True, help="ISO datetime")
 
+    coverage_parser = subparsers.add_parser("coverage", help="Pokrycie nagraniami na osi czasu")
+    coverage_parser.add_argument("--start", required=True, help="ISO datetime")
+    coverage_parser.add_argument("--end", required=True, help="ISO datetime")
+    coverage_parser.add_argument("--columns", type=int, default=80)
+
+    analyze_parser = subparsers.add_parser("analyze-activity", help="Indeks aktywności (różnice klatek)")
+    analyze_parser.add_argument("--camera", default=None)
+    analyze_parser.add_argument("--workers", type=int, default=None, help="Liczba procesów")
+
+    next_activity_parser = subparsers.add_parser("next-activity", help="Następna aktywność po czasie")
+    next_activity_parser.add_argument("--camera", required=True)
+    next_activity_parser.add_argument("--after", required=True, help="ISO datetime")
+    next_activity_parser.add_argument("--threshold", type=float, default=4.0)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Zrzut klatki ze wszystkich kamer dla czasu")
+    snapshot_parser.add_argument("--timestamp", required=True, help="ISO datetime")
+    snapshot_parser.add_argument("--output", type=Path, required=True)
+
     evidence_parser = subparsers.add_parser("evidence", help="Eksportuj pakiet dowodowy")
     evidence_parser.add_argument("--camera", required=True)
     evidence_parser.add_argument("--start", required=True, help="ISO datetime")
     evidence_parser.add_argument("--end", required=True, help="ISO datetime")
     evidence_parser.add_argument("--output", type=Path, required=True)
+    evidence_parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Zapisz pakiet strumieniowo jako jedno archiwum ZIP (+ plik .sha256)",
+    )
+
+    export_index_parser = subparsers.add_parser("export-index", help="Eksportuj przenośny indeks skanowania")
+    export_index_parser.add_argument("--output", type=Path, required=True)
+
+    import_index_parser = subparsers.add_parser("import-index", help="Importuj przenośny indeks skanowania")
+    import_index_parser.add_argument("--input", type=Path, required=True)
+
+    proxies_parser = subparsers.add_parser("proxies", help="Generuj proxy niskiej rozdzielczości w tle")
+    add_proxy_arguments(proxies_parser)
+    proxies_parser.add_argument("--limit", type=int, default=None, help="Maksymalna liczba klipów")
+    proxies_parser.add_argument("--workers", type=int, default=1, help="Równoległe transkodowania")
+    proxies_parser.add_argument("--threads", type=int, default=2, help="Wątki ffmpeg na transkodowanie")
+
+    playback_parser = subparsers.add_parser("playback", help="Źródło odtwarzania (proxy lub oryginał)")
+    add_proxy_arguments(playback_parser)
+    playback_parser.add_argument("--camera", required=True)
+    playback_parser.add_argument("--timestamp", required=True, help="ISO datetime")
 
     return parser
 
 
+def add_proxy_arguments(subparser: argparse.ArgumentParser) -> None:
+    subparser.add_argument("--proxy-dir", type=Path, default=None, help="Katalog cache proxy")
+    subparser.add_argument("--max-size-gb", type=float, default=20.0, help="Limit rozmiaru cache proxy")
+
+
 def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
+    # Ten sam katalog podany dwa razy skanowałby się równolegle do jednego cache.
+    args.root = unique_roots(args.root)
 
-    if args.command == "scan":
-        _, summary = run_scan(args.root, args.timezone)
+    if args.command == "scan" and args.lazy:
+        run_lazy_scan(single_root(args.root, "--lazy"), args.timezone, args.cache_dir)
+    elif args.command == "scan":
+        _, summary = run_scan(args.root, args.timezone, args.cache_dir, args.root_timeout)
         print(summary)
     elif args.command == "list-cameras":
-        list_cameras(args.root, args.timezone)
+        list_cameras(args.root, args.timezone, args.cache_dir, args.root_timeout)
     elif args.command == "list-clips":
-        list_clips(args.root, args.timezone, args.camera)
+        list_clips(args.root, args.timezone, args.camera, args.cache_dir, args.root_timeout)
     elif args.command == "clip-at":
-        clip_at(args.root, args.timezone, args.timestamp)
+        clip_at(args.root, args.timezone, args.timestamp, args.cache_dir, args.lazy, args.root_timeout)
+    elif args.command == "coverage":
+        coverage(args.root, args.timezone, args.start, args.end, args.columns, args.cache_dir)
+    elif args.command == "analyze-activity":
+        analyze_activity(args.root, args.timezone, args.camera, args.workers, args.cache_dir)
+    elif args.command == "next-activity":
+        next_activity(args.root, args.timezone, args.camera, args.after, args.threshold, args.cache_dir)
+    elif args.command == "snapshot":
+        snapshot(
+            args.root,
+            args.timezone,
+            args.timestamp,
+            args.output,
+            args.cache_dir,
+            args.lazy,
+            args.root_timeout,
+        )
     elif args.command == "evidence":
-        export_evidence(args.root, args.timezone, args.camera, args.start, args.end, args.output)
+        export_evidence(
+            args.root,
+            args.timezone,
+            args.camera,
+            args.start,
+            args.end,
+            args.output,
+            args.cache_dir,
+            args.lazy,
+            args.archive,
+            args.root_timeout,
+        )
+    elif args.command == "export-index":
+        export_index(args.root, args.timezone, args.output, args.cache_dir)
+    elif args.command == "import-index":
+        import_index(args.root, args.input, args.cache_dir)
+    elif args.command == "proxies":
+        generate_proxies(
+            args.root,
+            args.timezone,
+            args.proxy_dir,
+            args.max_size_gb,
+            args.limit,
+            args.workers,
+            args.threads,
+            args.cache_dir,
+            args.root_timeout,
+        )
+    elif args.command == "playback":
+        playback(
+            args.root,
+            args.timezone,
+            args.camera,
+            args.timestamp,
+            args.proxy_dir,
+            args.max_size_gb,
+            args.cache_dir,
+            args.lazy,
+            args.root_timeout,
+        )
     else:
         raise SystemExit("Nieznana komenda")
 